@@ -69,6 +69,12 @@ variable "pinecone_index" {
   default     = "model-earth-jam-stack"
 }
 
+variable "embedding_dimensions" {
+  description = "Embedding dimension (Matryoshka prefix of text-embedding-3-small); must match the Pinecone index"
+  type        = number
+  default     = 1536
+}
+
 # =============================================================================
 # PROVIDER & DATA SOURCES
 # =============================================================================
@@ -233,6 +239,7 @@ module "query_handler_lambda" {
     PINECONE_API_KEY     = var.pinecone_api_key
     PINECONE_ENVIRONMENT = var.pinecone_environment
     PINECONE_INDEX       = var.pinecone_index
+    EMBEDDING_DIMENSIONS = tostring(var.embedding_dimensions)
     S3_CONFIG_BUCKET     = aws_s3_bucket.config_storage.id
   }
 
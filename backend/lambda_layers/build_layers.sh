@@ -13,6 +13,11 @@ set -euo pipefail
 PY_CMD="${PY_CMD:-python3.13}"   # must match Lambda runtime (python3.13)
 TARGET_DIR="${TARGET_DIR:-python}"
 PUBLISH="${PUBLISH:-false}"      # set true or pass --publish to publish via AWS CLI
+# Wheels are resolved for the Lambda runtime, not the build machine, so a build on
+# macOS or a different Python still ships the right native binaries
+LAYER_PLATFORM="${LAYER_PLATFORM:-manylinux2014_x86_64}"
+LAYER_PYTHON_VERSION="${LAYER_PYTHON_VERSION:-3.13}"
+export PIP_DISABLE_PIP_VERSION_CHECK=1
 
 # Define only the layers we actually need
 declare -A LAYERS=(
@@ -63,14 +68,32 @@ build_layer() {
     echo "   Python: $("$PY_CMD" --version 2>&1)"
     echo "   Pip:    $("$PY_CMD" -m pip --version 2>&1)"
     
-    # Install dependencies
-    echo "📦 Installing dependencies..."
+    # .pyc files are only usable when compiled by the runtime's Python version
+    local compile_flag="--no-compile"
+    if [[ "$("$PY_CMD" -c 'import sys; print("%d.%d" % sys.version_info[:2])')" == "$LAYER_PYTHON_VERSION" ]]; then
+        compile_flag="--compile"
+    fi
+
+    # Install dependencies (prebuilt wheels only: no sdist builds, no host binaries)
+    echo "📦 Installing dependencies for $LAYER_PLATFORM / Python $LAYER_PYTHON_VERSION..."
     "$PY_CMD" -m pip install --upgrade pip
-    "$PY_CMD" -m pip install -r "$req_file" --no-cache-dir --target "$TARGET_DIR"
+    "$PY_CMD" -m pip install -r "$req_file" --no-cache-dir --target "$TARGET_DIR" \
+        --platform "$LAYER_PLATFORM" --implementation cp --python-version "$LAYER_PYTHON_VERSION" \
+        --only-binary=:all: --upgrade "$compile_flag"
     
-    # Create zip file
+    # Drop what the runtime never loads: bundled test suites and native debug
+    # symbols. Runtime-matching .pyc files stay, since Lambda can't write them
+    # to /opt and would recompile every cold start.
+    echo "🧹 Stripping tests and debug symbols..."
+    find "$TARGET_DIR" -type d -name tests -prune -exec rm -rf {} +
+    find "$TARGET_DIR" -name '*.pyo' -delete
+    if [[ "$(uname -s)" == "Linux" ]] && command -v strip >/dev/null 2>&1; then
+        find "$TARGET_DIR" -type f \( -name '*.so' -o -name '*.so.*' \) -exec strip --strip-unneeded {} + 2>/dev/null || true
+    fi
+
+    # Create zip file (max deflate, no extra file attributes)
     echo "🗜️  Creating zip file..."
-    zip -r "$out_zip" "$TARGET_DIR" >/dev/null
+    zip -r -9 -X "$out_zip" "$TARGET_DIR" >/dev/null
     
     # Show size
     local size=$(ls -lh "$out_zip" | awk '{print $5}')
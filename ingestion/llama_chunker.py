@@ -9,9 +9,11 @@ Replaces:
 Single source of truth for all chunking operations.
 """
 
+import hashlib
 import os
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 from llama_index.core.node_parser import (
     CodeSplitter,
@@ -25,6 +27,10 @@ import json
 import yaml
 
 
+# Parsed chunks kept per (extension, content digest); identical files such as
+# copied READMEs, configs and vendored sources are only parsed once per run
+CHUNK_CACHE_SIZE = 512
+
 class LlamaChunker:
     """
     Simplified chunker using LlamaIndex node parsers
@@ -39,13 +45,15 @@ class LlamaChunker:
     def __init__(self):
         """Initialize LlamaIndex parsers"""
 
-        # Code parser (tree-sitter based, AST-aware)
-        self.code_splitter = CodeSplitter(
-            language="python",  # Updated per file
-            chunk_lines=50,
-            chunk_lines_overlap=15,
-            max_chars=2000
-        )
+        # Code parsers (tree-sitter based, AST-aware), one per language.
+        # CodeSplitter binds its tree-sitter parser at construction, so each
+        # language gets its own splitter, built the first time it is needed.
+        self._code_splitters: Dict[str, CodeSplitter] = {}
+
+        # LRU of (text, start_line, end_line) chunks by (ext, content digest)
+        self._chunk_cache: OrderedDict = OrderedDict()
+        self._chunk_cache_hits = 0
+        self._chunk_cache_misses = 0
 
         # Markdown parser (header-aware)
         self.markdown_parser = MarkdownNodeParser()
@@ -89,6 +97,12 @@ class LlamaChunker:
         self.json_exts = {'.json', '.jsonl'}
         self.yaml_exts = {'.yaml', '.yml'}
 
+        # Extension -> parser kind, so dispatch is a single dict lookup
+        self._parser_kinds: Dict[str, str] = {}
+        for kind, exts in (('yaml', self.yaml_exts), ('json', self.json_exts),
+                           ('markdown', self.markdown_exts), ('code', self.code_exts)):
+            self._parser_kinds.update(dict.fromkeys(exts, kind))
+
     def chunk_file(self, file_path: str) -> List[str]:
         """
         Chunk a file into semantic segments
@@ -114,26 +128,8 @@ class LlamaChunker:
         ext = Path(file_path).suffix.lower()
         language = self.language_map.get(ext, '')
 
-        # Create LlamaIndex Document
-        document = Document(
-            text=content,
-            metadata={
-                'file_path': str(file_path),
-                'file_name': Path(file_path).name,
-                'language': language,
-            }
-        )
-
-        # Parse with appropriate parser
-        try:
-            nodes = self._parse_document(document, ext, language)
-        except Exception as e:
-            print(f"Parsing error for {file_path}: {e}")
-            # Fallback to sentence splitter
-            nodes = self.sentence_splitter.get_nodes_from_documents([document])
-
         # Extract text content from nodes
-        chunks = [node.text for node in nodes if node.text.strip()]
+        chunks = [text for text, _, _ in self._chunk_content(file_path, content, ext, language)]
 
         return chunks
 
@@ -167,6 +163,41 @@ class LlamaChunker:
         ext = Path(file_path).suffix.lower()
         language = self.language_map.get(ext, '')
 
+        # Convert to detailed format
+        chunks = []
+        for text, start_line, end_line in self._chunk_content(file_path, content, ext, language):
+            chunk = {
+                'content': text,
+                'type': self._classify_chunk_type(text, language),
+                'start_line': start_line,
+                'end_line': end_line,
+                'language': language
+            }
+            chunks.append(chunk)
+
+        return chunks
+
+    def _chunk_content(self, file_path: str, content: str, ext: str, language: str) -> List[Tuple[str, int, int]]:
+        """
+        Parse file content into non-empty chunks, reusing cached results
+
+        Args:
+            file_path: Path of the file (for document metadata and errors)
+            content: File text
+            ext: File extension
+            language: Programming language
+
+        Returns:
+            List of (text, start_line, end_line) tuples
+        """
+        key = (ext, hashlib.blake2b(content.encode('utf-8', errors='ignore'), digest_size=16).digest())
+        cached = self._chunk_cache.get(key)
+        if cached is not None:
+            self._chunk_cache_hits += 1
+            self._chunk_cache.move_to_end(key)
+            return cached
+        self._chunk_cache_misses += 1
+
         # Create LlamaIndex Document
         document = Document(
             text=content,
@@ -182,23 +213,18 @@ class LlamaChunker:
             nodes = self._parse_document(document, ext, language)
         except Exception as e:
             print(f"Parsing error for {file_path}: {e}")
+            # Fallback to sentence splitter
             nodes = self.sentence_splitter.get_nodes_from_documents([document])
 
-        # Convert to detailed format
-        chunks = []
-        for node in nodes:
-            if not node.text.strip():
-                continue
-
-            chunk = {
-                'content': node.text,
-                'type': self._classify_chunk_type(node.text, language),
-                'start_line': node.metadata.get('start_line', 0),
-                'end_line': node.metadata.get('end_line', 0),
-                'language': language
-            }
-            chunks.append(chunk)
+        chunks = [
+            (node.text, node.metadata.get('start_line', 0), node.metadata.get('end_line', 0))
+            for node in nodes
+            if node.text.strip()
+        ]
 
+        self._chunk_cache[key] = chunks
+        if len(self._chunk_cache) > CHUNK_CACHE_SIZE:
+            self._chunk_cache.popitem(last=False)
         return chunks
 
     def _parse_document(self, document: Document, ext: str, language: str) -> List[BaseNode]:
@@ -213,20 +239,21 @@ class LlamaChunker:
         Returns:
             List of LlamaIndex nodes
         """
-        if ext in self.code_exts and language:
+        kind = self._parser_kinds.get(ext)
+
+        if kind == 'code' and language:
             # Code-aware parsing (respects AST structure)
-            self.code_splitter.language = language
-            return self.code_splitter.get_nodes_from_documents([document])
+            return self._get_code_splitter(language).get_nodes_from_documents([document])
 
-        elif ext in self.markdown_exts:
+        elif kind == 'markdown':
             # Markdown-aware parsing (respects headers)
             return self.markdown_parser.get_nodes_from_documents([document])
 
-        elif ext in self.json_exts:
+        elif kind == 'json':
             # JSON structure-aware parsing
             return self.json_parser.get_nodes_from_documents([document])
 
-        elif ext in self.yaml_exts:
+        elif kind == 'yaml':
             # YAML → JSON → structure-aware parsing
             try:
                 data = yaml.safe_load(document.text)
@@ -244,6 +271,27 @@ class LlamaChunker:
             # Generic sentence-based parsing
             return self.sentence_splitter.get_nodes_from_documents([document])
 
+    def _get_code_splitter(self, language: str) -> CodeSplitter:
+        """
+        Get the code splitter for a language, creating it on first use
+
+        Args:
+            language: Programming language
+
+        Returns:
+            CodeSplitter bound to that language's tree-sitter parser
+        """
+        splitter = self._code_splitters.get(language)
+        if splitter is None:
+            splitter = CodeSplitter(
+                language=language,
+                chunk_lines=50,
+                chunk_lines_overlap=15,
+                max_chars=2000
+            )
+            self._code_splitters[language] = splitter
+        return splitter
+
     def _classify_chunk_type(self, content: str, language: str) -> str:
         """
         Classify chunk type based on content
@@ -287,10 +335,18 @@ class LlamaChunker:
             'supported_languages': len(self.language_map),
             'code_languages': len(self.code_exts),
             'markdown_formats': len(self.markdown_exts),
-            'parser_types': 3  # code, markdown, sentence
+            'parser_types': 3,  # code, markdown, sentence
+            'code_splitters_loaded': len(self._code_splitters),
+            'chunk_cache_size': len(self._chunk_cache),
+            'chunk_cache_hits': self._chunk_cache_hits,
+            'chunk_cache_misses': self._chunk_cache_misses,
         }
 
 
+# Shared instance for chunk_file(), so parsers are built once per process
+_default_chunker = None
+
+
 # Convenience function for direct import compatibility
 def chunk_file(file_path: str) -> List[str]:
     """
@@ -302,5 +358,7 @@ def chunk_file(file_path: str) -> List[str]:
     Returns:
         List of chunk strings
     """
-    chunker = LlamaChunker()
-    return chunker.chunk_file(file_path)
+    global _default_chunker
+    if _default_chunker is None:
+        _default_chunker = LlamaChunker()
+    return _default_chunker.chunk_file(file_path)
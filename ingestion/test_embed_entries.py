@@ -0,0 +1,134 @@
+"""
+Unit tests for embed_entries in codechat/ingestion/vector_db_sync.py.
+
+No API calls: openai_client is replaced with a stub that records each
+embeddings request.
+
+Scenarios:
+- Chunks from several files are packed into EMBED_BATCH-sized requests
+- Identical chunks are embedded once and share the vector
+- Summary and oversize chunks are not embedded
+- A failed request fails every file it covered, and only those
+- Throttled (429) requests are retried instead of failing the batch
+
+Run: python codechat/ingestion/test_embed_entries.py (or pytest)
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+THIS_DIR = Path(__file__).parent  # codechat/ingestion/
+sys.path.insert(0, str(THIS_DIR))
+import vector_db_sync  # type: ignore
+
+
+class FakeRateLimitError(Exception):
+    pass
+
+
+class StubEmbeddings:
+    """Returns [len(text), position] per input; raises for texts listed in fail_on"""
+
+    def __init__(self, fail_on=(), throttle_times: int = 0):
+        self.requests = []
+        self.fail_on = set(fail_on)
+        self.throttle_times = throttle_times
+
+    def create(self, input, model, dimensions):
+        if self.throttle_times:
+            self.throttle_times -= 1
+            raise FakeRateLimitError("429 Too Many Requests")
+        self.requests.append(list(input))
+        if self.fail_on.intersection(input):
+            raise ValueError("request rejected")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text)), float(i)])
+                                     for i, text in enumerate(input)])
+
+
+def make_entry(file_path: str, content: str, chunk_type: str = "content", token_count: int = 10) -> dict:
+    return {
+        "id": f"{file_path}:{content}",
+        "values": [],
+        "metadata": {
+            "file_path": file_path,
+            "content": content,
+            "chunk_type_id": vector_db_sync.CHUNK_TYPE_IDS[chunk_type],
+            "token_count": token_count,
+            "flags": 0,
+            "status": "M",
+        },
+    }
+
+
+def run_embed(entries, stub: StubEmbeddings, batch: int = 2) -> dict:
+    saved = (vector_db_sync.openai_client, vector_db_sync.EMBED_BATCH,
+             vector_db_sync.RateLimitError, vector_db_sync.time.sleep)
+    vector_db_sync.openai_client = SimpleNamespace(embeddings=stub)
+    vector_db_sync.EMBED_BATCH = batch
+    vector_db_sync.RateLimitError = FakeRateLimitError
+    vector_db_sync.time.sleep = lambda seconds: None
+    try:
+        return vector_db_sync.embed_entries(entries)
+    finally:
+        (vector_db_sync.openai_client, vector_db_sync.EMBED_BATCH,
+         vector_db_sync.RateLimitError, vector_db_sync.time.sleep) = saved
+
+
+def test_batches_across_files_and_dedupes():
+    entries = [
+        make_entry("a.py", "alpha"),
+        make_entry("a.py", "license"),
+        make_entry("b.py", "license"),
+        make_entry("b.py", "beta"),
+        make_entry("c.md", "gamma"),
+    ]
+    stub = StubEmbeddings()
+    assert run_embed(entries, stub) == {}
+
+    # 4 unique texts in requests of 2, the duplicate sent once
+    assert stub.requests == [["alpha", "license"], ["beta", "gamma"]]
+    assert entries[1]["values"] == entries[2]["values"] == [7.0, 1.0]
+    assert entries[3]["values"] == [4.0, 0.0]
+    for entry in entries:
+        assert entry["metadata"]["flags"] & vector_db_sync.FLAG_EMBEDDED
+
+
+def test_skips_summary_and_oversize_chunks():
+    entries = [
+        make_entry("a.csv", "summary", chunk_type="summary"),
+        make_entry("a.py", "huge", token_count=vector_db_sync.MAX_TOKENS + 1),
+        make_entry("a.py", "small"),
+    ]
+    stub = StubEmbeddings()
+    assert run_embed(entries, stub) == {}
+    assert stub.requests == [["small"]]
+    assert entries[0]["values"] == [] and entries[1]["values"] == []
+
+
+def test_failed_request_fails_only_its_files():
+    entries = [
+        make_entry("a.py", "one"),
+        make_entry("b.py", "bad"),
+        make_entry("c.py", "three"),
+        make_entry("c.py", "four"),
+    ]
+    failed = run_embed(entries, StubEmbeddings(fail_on={"bad"}))
+    assert set(failed) == {"a.py", "b.py"}
+    assert failed["a.py"][0] == "M" and "request rejected" in failed["a.py"][1]
+    assert entries[2]["values"] and entries[3]["values"]
+
+
+def test_throttled_request_is_retried():
+    entries = [make_entry("a.py", "one")]
+    stub = StubEmbeddings(throttle_times=2)
+    assert run_embed(entries, stub) == {}
+    assert stub.requests == [["one"]]
+    assert entries[0]["values"] == [3.0, 0.0]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -24,32 +24,88 @@ Env vars
 - PINECONE_REGION (serverless; default: us-east-1)
 - PINECONE_ENV (classic fallback; default: us-west1-gcp)
 - PINECONE_INDEX (optional, default: repo-chunks)
+- EMBEDDING_DIMENSIONS (optional, default: 1536). text-embedding-3 models are
+  Matryoshka-trained, so a shorter prefix (e.g. 512) keeps most of the retrieval
+  quality at a fraction of the index size. Must match the index dimension and
+  the query handler's EMBEDDING_DIMENSIONS.
+- CHUNK_WORKERS (optional, default: CPU count). Processes used to chunk files
+  before embedding; 1 chunks serially in the main process.
+- EMBED_WORKERS (optional, default: 4). Embedding requests run concurrently;
+  throttled (429) requests are retried with exponential backoff.
+- EMBED_BATCH (optional, default: 512). Chunks per embedding request, shared
+  across files.
+- UPSERT_WORKERS (optional, default: 8). Upsert batches sent concurrently.
 """
 
 # pyright: basic
 
+import hashlib
 import os
+import random
 import sys
+import time
 import uuid
 import re
 import json
 from pathlib import Path
-from typing import List, Tuple, Optional
-from openai import OpenAI
+from typing import Dict, List, Tuple, Optional
+from openai import OpenAI, RateLimitError
 import tiktoken
 from tqdm import tqdm
 import argparse
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Import unified chunker (same directory)
 from llama_chunker import LlamaChunker
 
+# path_segments is shared with lib/pine.py so both ingestion paths write the same
+# field; lib.paths is standard library only, so the Pinecone SDK fallback below
+# still applies
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from lib.paths import path_segments
+
 # Constants
 MAX_TOKENS = 8192
 INDEX_NAME = "repo-chunks"
-DIMENSION = 1536
+DIMENSION = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
 METRIC = "cosine"
-BATCH_SIZE = 10
+# Upsert requests hold up to BATCH_SIZE vectors and UPSERT_BATCH_BYTES of
+# estimated JSON, leaving headroom under Pinecone's 2 MB request limit: a chunk
+# near MAX_TOKENS plus a 1536-dim vector is ~60 KB, a short one a few KB.
+# Batches are sent by UPSERT_WORKERS threads at once.
+BATCH_SIZE = 100
+UPSERT_BATCH_BYTES = 1_500_000
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "8"))
+
+# Chunking (tree-sitter parsing, tokenization) is CPU-bound Python, so files
+# are chunked in worker processes rather than threads; 1 disables the pool
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", str(os.cpu_count() or 1)))
+
+# Embedding is bound by OpenAI round trips: chunks from all files are sent in
+# shared requests of up to EMBED_BATCH inputs / EMBED_BATCH_TOKENS tokens (under
+# the API's per-request limits), and EMBED_WORKERS requests run concurrently.
+# 4 x 100k tokens in flight stays under typical embedding tokens-per-minute
+# limits on a large first sync; throttled requests back off up to EMBED_RETRIES times.
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "4"))
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "512"))
+EMBED_BATCH_TOKENS = 100_000
+EMBED_RETRIES = 6
+EMBED_RETRY_BASE_DELAY = 2.0  # seconds, doubled per attempt, full jitter
+EMBED_RETRY_MAX_DELAY = 60.0
+
+# Patterns compiled once at import rather than looked up in re's cache per call
+SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+')
+CHAR_WINDOW_RE = re.compile(r'.{1,3000}(?:\s+|$)')
+SUBMODULE_LINE_RE = re.compile(r"^Submodule\s+([^\s]+)\s+([0-9a-f]{7,})\.\.([0-9a-f]{7,}).*$")
+
+# Chunk types are stored as small integer codes in vector metadata
+# (low-cardinality string -> int keeps every upsert/query payload smaller)
+CHUNK_TYPE_IDS = {"content": 0, "summary": 1}
+
+# Per-chunk booleans are packed into a single integer "flags" metadata field
+FLAG_EMBEDDED = 1 << 0
+FLAG_SHOULD_EMBED = 1 << 1
 
 # Prefer serverless Pinecone SDK; fallback to classic client if not available
 USE_SERVERLESS = False
@@ -82,6 +138,22 @@ def count_tokens(text: str) -> int:
     return len(tokenizer.encode(text, allowed_special="all"))
 
 
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """Token counts for many texts in one tiktoken call (encoded in parallel, off the GIL)"""
+    if tokenizer is None:
+        return [len(text.split()) for text in texts]
+    return [len(tokens) for tokens in tokenizer.encode_batch(texts, allowed_special="all")]
+
+
+def pack_flags(embedded: bool = False, should_embed: bool = False) -> int:
+    flags = 0
+    if embedded:
+        flags |= FLAG_EMBEDDED
+    if should_embed:
+        flags |= FLAG_SHOULD_EMBED
+    return flags
+
+
 def re_chunk_if_oversize(sections: List[str], max_tokens: int = MAX_TOKENS) -> List[str]:
     final_chunks: List[str] = []
     for section in sections:
@@ -93,7 +165,7 @@ def re_chunk_if_oversize(sections: List[str], max_tokens: int = MAX_TOKENS) -> L
         if tokens <= max_tokens:
             final_chunks.append(section)
         else:
-            split_points = re.split(r'(?<=[.!?])\s+', section)
+            split_points = SENTENCE_BREAK_RE.split(section)
             current_chunk = ""
 
             for part in split_points:
@@ -113,7 +185,7 @@ def re_chunk_if_oversize(sections: List[str], max_tokens: int = MAX_TOKENS) -> L
                 if count_tokens(chunk) <= max_tokens:
                     really_final.append(chunk)
                 else:
-                    char_chunks = re.findall(r'.{1,3000}(?:\s+|$)', chunk)
+                    char_chunks = CHAR_WINDOW_RE.findall(chunk)
                     really_final.extend([s.strip() for s in char_chunks if s.strip()])
             final_chunks = really_final
 
@@ -177,7 +249,9 @@ Type: {file_type}
 """
         if size_mb < 1 and file_type in {'txt', 'log', 'conf', 'ini', 'cfg'}:
             try:
-                preview = path.read_text(encoding='utf-8', errors='ignore')[:500]
+                # Only the preview is needed, so don't materialize the whole file
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    preview = f.read(500)
                 summary += f"\nPreview:\n{preview}..."
             except Exception:
                 pass
@@ -212,22 +286,126 @@ def dispatch_chunking(filepath: Path):
     return chunk_as_summary(path)
 
 
-def get_embedding(text: str) -> List[float]:
-    if not text or not text.strip():
+def _init_chunk_worker() -> None:
+    """Give each chunking worker process its own chunker and tokenizer"""
+    global chunker, tokenizer
+    chunker = LlamaChunker()
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+
+
+def _chunk_path(filepath: str):
+    try:
+        return dispatch_chunking(Path(filepath))
+    except Exception as e:
+        # Leave it to process_file, which chunks inline and reports the error
+        print(f"[warn] Parallel chunking failed for {filepath}: {e}")
+        return None
+
+
+def prechunk_files(filepaths: List[str]) -> dict:
+    """Chunk files across CHUNK_WORKERS processes; returns {path: (chunks, should_embed)}"""
+    filepaths = list(dict.fromkeys(filepaths))
+    if CHUNK_WORKERS <= 1 or len(filepaths) < 2:
+        return {}
+    workers = min(CHUNK_WORKERS, len(filepaths))
+    # Several files per task to cut IPC, but small enough that every worker
+    # gets a few tasks and one slow file doesn't hold up a whole batch
+    chunksize = max(1, len(filepaths) // (workers * 4))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_chunk_worker) as executor:
+            results = list(executor.map(_chunk_path, filepaths, chunksize=chunksize))
+    except Exception as e:
+        print(f"[warn] Parallel chunking unavailable, chunking serially: {e}")
+        return {}
+    return {fp: result for fp, result in zip(filepaths, results) if result is not None}
+
+
+def _create_embeddings(texts: List[str]):
+    """embeddings.create, backing off on throttling (the SDK's own retries are few and short)"""
+    for attempt in range(EMBED_RETRIES):
+        try:
+            return openai_client.embeddings.create(
+                input=texts,
+                model="text-embedding-3-small",
+                dimensions=DIMENSION
+            )
+        except RateLimitError:
+            if attempt == EMBED_RETRIES - 1:
+                raise
+            delay = random.uniform(0, min(EMBED_RETRY_MAX_DELAY, EMBED_RETRY_BASE_DELAY * 2 ** attempt))
+            print(f"[warn] Embedding request throttled; retry {attempt + 1}/{EMBED_RETRIES - 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed several texts in one request; embeddings come back in input order"""
+    if any(not text or not text.strip() for text in texts):
         raise RuntimeError("Empty text provided for embedding")
     try:
-        response = openai_client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
-        )
-        embedding = response.data[0].embedding
-        if not embedding:
+        response = _create_embeddings(texts)
+        embeddings = [item.embedding for item in response.data]
+        if len(embeddings) != len(texts) or not all(embeddings):
             raise RuntimeError("Received empty embedding from API")
-        return embedding
+        return embeddings
     except Exception as e:
         raise RuntimeError(f"Embedding failed: {e}")
 
 
+def _needs_embedding(entry: dict) -> bool:
+    md = entry["metadata"]
+    return md["chunk_type_id"] == CHUNK_TYPE_IDS["content"] and md["token_count"] <= MAX_TOKENS
+
+
+def embed_entries(entries: List[dict]) -> dict:
+    """
+    Fill in vectors for content chunks using batched, concurrent embedding requests.
+    Returns {file_path: (status, message)} for files whose chunks could not be embedded.
+    """
+    # Identical chunks (licenses, boilerplate, copied files) are embedded once and
+    # share the vector; each still gets its own record for its file
+    groups: Dict[bytes, List[dict]] = {}
+    for entry in filter(_needs_embedding, entries):
+        digest = hashlib.blake2b(entry["metadata"]["content"].encode("utf-8"), digest_size=16).digest()
+        groups.setdefault(digest, []).append(entry)
+
+    batches: List[List[List[dict]]] = []
+    batch: List[List[dict]] = []
+    batch_tokens = 0
+    for group in groups.values():
+        tokens = group[0]["metadata"]["token_count"]
+        if batch and (len(batch) >= EMBED_BATCH or batch_tokens + tokens > EMBED_BATCH_TOKENS):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(group)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    if not batches:
+        return {}
+
+    def embed_batch(batch: List[List[dict]]) -> None:
+        vectors = get_embeddings([group[0]["metadata"]["content"] for group in batch])
+        for group, vector in zip(batch, vectors):
+            for entry in group:
+                entry["values"] = vector
+                entry["metadata"]["flags"] |= FLAG_EMBEDDED
+
+    total = sum(len(group) for group in groups.values())
+    print(f"[info] Embedding {len(groups)} unique of {total} chunks in {len(batches)} requests...")
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(EMBED_WORKERS, len(batches)))) as executor:
+        futures = [executor.submit(embed_batch, b) for b in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                future.result()
+            except Exception as e:
+                for group in batch:
+                    for entry in group:
+                        md = entry["metadata"]
+                        failed.setdefault(md["file_path"], (md["status"], str(e)))
+    return failed
+
+
 def get_accurate_line_range(chunk: str, full_text: str) -> str:
     if not full_text or not chunk:
         return "L1-L1"
@@ -264,13 +442,13 @@ def get_accurate_line_range(chunk: str, full_text: str) -> str:
         return "L1-L1"
 
 
-def process_file(filepath: str, status: str, repo_name: str):
+def process_file(filepath: str, status: str, repo_name: str, chunked: Optional[Tuple[List[str], bool]] = None):
     try:
         if not Path(filepath).exists():
             print(f"[warn] File not found: {filepath}")
             return []
 
-        chunks, should_embed = dispatch_chunking(Path(filepath))
+        chunks, should_embed = chunked if chunked is not None else dispatch_chunking(Path(filepath))
         chunk_entries = []
 
         full_text = ""
@@ -280,32 +458,34 @@ def process_file(filepath: str, status: str, repo_name: str):
             except Exception as e:
                 print(f"[warn] Could not read full text for {filepath}: {e}")
 
+        # Per-file features are computed once, not per chunk
+        file_type = detect_file_type(filepath)
+        segments = path_segments(filepath)
+        token_counts = count_tokens_batch([chunk or "" for chunk in chunks])
+
         for i, chunk in enumerate(chunks):
             if not chunk or not chunk.strip():
                 continue
 
             chunk_id = str(uuid.uuid4())
-            vector: List[float] = []
-
-            if should_embed and count_tokens(chunk) <= MAX_TOKENS:
-                vector = get_embedding(chunk)
+            token_count = token_counts[i]
 
             chunk_entry = {
                 "id": chunk_id,
-                "values": vector,
+                # Filled in (and FLAG_EMBEDDED set) by embed_entries, batched across files
+                "values": [],
                 "metadata": {
                     "repo_name": repo_name,
                     "file_path": str(filepath),
-                    "file_type": detect_file_type(filepath),
-                    "chunk_type": "summary" if not should_embed else "content",
+                    "file_type": file_type,
+                    "path_segments": segments,
+                    "chunk_type_id": CHUNK_TYPE_IDS["content" if should_embed else "summary"],
                     "chunk_index": i,
-                    "chunk_id": chunk_id,
                     "content": chunk,
                     "line_range": get_accurate_line_range(chunk, full_text),
-                    "embedded": bool(vector),
-                    "should_embed": bool(should_embed),
+                    "flags": pack_flags(should_embed=bool(should_embed)),
                     "status": status,
-                    "token_count": count_tokens(chunk)
+                    "token_count": token_count
                 }
             }
             chunk_entries.append(chunk_entry)
@@ -333,10 +513,32 @@ def safe_delete_vectors(file_path: str, repo_name: str) -> None:
         raise
 
 
+def _upsert_size(entry: dict) -> int:
+    """Estimated JSON size of an upsert record (a float is at most ~24 characters)"""
+    return len(entry["id"]) + 24 * len(entry["values"]) + len(json.dumps(entry["metadata"])) + 64
+
+
+def upsert_batches(entries: List[dict]) -> List[List[dict]]:
+    """Split entries into upsert requests by count and estimated serialized size"""
+    batches: List[List[dict]] = []
+    batch: List[dict] = []
+    batch_bytes = 0
+    for entry in entries:
+        size = _upsert_size(entry)
+        if batch and (len(batch) >= BATCH_SIZE or batch_bytes + size > UPSERT_BATCH_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(entry)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 def safe_upsert_batch(batch: List[dict], repo_name: str) -> int:
     for entry in batch:
         md = entry.get("metadata", {})
-        if md.get("chunk_type") == "content" and not entry.get("values"):
+        if md.get("chunk_type_id") == CHUNK_TYPE_IDS["content"] and not entry.get("values"):
             raise RuntimeError(f"Attempted to upsert empty embedding: {md.get('file_path')}")
     index.upsert(vectors=batch, namespace=repo_name)
     return len(batch)
@@ -434,7 +636,11 @@ def _run_git(args: List[str], cwd: str) -> str:
 def _parse_submodule_short(diff_text: str) -> List[Tuple[str, str, str]]:
     results: List[Tuple[str, str, str]] = []
     for line in diff_text.splitlines():
-        m = re.match(r"^Submodule\s+([^\s]+)\s+([0-9a-f]{7,})\.\.([0-9a-f]{7,}).*$", line.strip())
+        line = line.strip()
+        # Most diff lines are file hunks; a prefix check skips the regex for them
+        if not line.startswith("Submodule"):
+            continue
+        m = SUBMODULE_LINE_RE.match(line)
         if m:
             results.append((m.group(1), m.group(2), m.group(3)))
     return results
@@ -461,8 +667,9 @@ def compute_changes_from_git(repo_root: str, from_rev: str, to_rev: str) -> List
     for sub_path, oldsha, newsha in _parse_submodule_short(sub_out):
         sub_abs = str(Path(repo_root) / sub_path)
         sub_gitdir = str(Path(repo_root) / ".git" / "modules" / sub_path)
-        added = (oldsha == "0000000" or re.fullmatch(r"0+", oldsha) is not None)
-        deleted = (newsha == "0000000" or re.fullmatch(r"0+", newsha) is not None)
+        # All-zero SHA marks an added/removed submodule (shas are non-empty hex)
+        added = not oldsha.strip("0")
+        deleted = not newsha.strip("0")
         try:
             if added:
                 # List all files at newsha as added
@@ -674,6 +881,16 @@ def run_sync(files_to_process: List[Tuple[str, str]], errors_out: str):
     file_stats = {"processed": 0, "errors": 0, "skipped": 0}
     failures: List[dict] = []
 
+    # Chunk every file up front in parallel
+    prechunked = prechunk_files(
+        [fp for status, fp in files_to_process if status != "D" and Path(fp).exists()]
+    )
+
+    def record_process_failure(filepath: str, status: str, message: str) -> None:
+        file_stats["errors"] += 1
+        failures.append({"file_path": filepath, "operation": "process", "message": message, "status": status})
+        append_error(errors_out, filepath, "process", message, status=status)
+
     # Process files
     for status, filepath in files_to_process:
         try:
@@ -685,13 +902,19 @@ def run_sync(files_to_process: List[Tuple[str, str]], errors_out: str):
                 raise FileNotFoundError(f"File marked as {status} but not found: {filepath}")
             if status in ("A", "M"):
                 delete_operations.append(filepath)
-            chunks = process_file(filepath, status, repo_name)
+            chunks = process_file(filepath, status, repo_name, prechunked.get(filepath))
             to_upsert.extend(chunks)
             file_stats["processed"] += 1
         except Exception as e:
-            file_stats["errors"] += 1
-            failures.append({"file_path": filepath, "operation": "process", "message": str(e), "status": status})
-            append_error(errors_out, filepath, "process", str(e), status=status)
+            record_process_failure(filepath, status, str(e))
+
+    # Embed all files' chunks together; a failed request fails every file it covered
+    failed_embeddings = embed_entries(to_upsert)
+    if failed_embeddings:
+        to_upsert = [e for e in to_upsert if e["metadata"]["file_path"] not in failed_embeddings]
+        for filepath, (status, message) in failed_embeddings.items():
+            file_stats["processed"] -= 1
+            record_process_failure(filepath, status, message)
 
     print(f"\n[info] Deleting vectors for {len(delete_operations)} files...")
     for filepath in delete_operations:
@@ -705,25 +928,28 @@ def run_sync(files_to_process: List[Tuple[str, str]], errors_out: str):
     upserted_ids: List[str] = []
     total_upserted = 0
     if to_upsert:
-        print(f"\n[info] Upserting {len(to_upsert)} chunks in batches of {BATCH_SIZE}...")
-        for i in tqdm(range(0, len(to_upsert), BATCH_SIZE), desc="Upserting"):
-            batch = to_upsert[i:i + BATCH_SIZE]
-            try:
-                upserted_count = safe_upsert_batch(batch, repo_name)
-                total_upserted += upserted_count
-                for it in batch:
-                    uid = it.get('id')
-                    if isinstance(uid, str):
-                        upserted_ids.append(uid)
-            except Exception as e:
-                file_stats["errors"] += 1
-                paths_statuses = set(
-                    (it.get("metadata", {}).get("file_path"), it.get("metadata", {}).get("status", "M")) for it in
-                    batch)
-                for fp, st in paths_statuses:
-                    failures.append(
-                        {"file_path": fp or "<unknown>", "operation": "upsert", "message": str(e), "status": st})
-                    append_error(errors_out, fp or "<unknown>", "upsert", str(e), status=st or "M")
+        batches = upsert_batches(to_upsert)
+        print(f"\n[info] Upserting {len(to_upsert)} chunks in {len(batches)} batches...")
+        # Batches are independent requests; send them concurrently, collect in order
+        with ThreadPoolExecutor(max_workers=max(1, min(UPSERT_WORKERS, len(batches)))) as executor:
+            futures = [executor.submit(safe_upsert_batch, batch, repo_name) for batch in batches]
+            for batch, future in tqdm(zip(batches, futures), total=len(batches), desc="Upserting"):
+                try:
+                    upserted_count = future.result()
+                    total_upserted += upserted_count
+                    for it in batch:
+                        uid = it.get('id')
+                        if isinstance(uid, str):
+                            upserted_ids.append(uid)
+                except Exception as e:
+                    file_stats["errors"] += 1
+                    paths_statuses = set(
+                        (it.get("metadata", {}).get("file_path"), it.get("metadata", {}).get("status", "M")) for it in
+                        batch)
+                    for fp, st in paths_statuses:
+                        failures.append(
+                            {"file_path": fp or "<unknown>", "operation": "upsert", "message": str(e), "status": st})
+                        append_error(errors_out, fp or "<unknown>", "upsert", str(e), status=st or "M")
 
     print(f"\n[info] Sync Complete for {repo_name}:")
     print(f"  - Files processed: {file_stats['processed']}")
@@ -731,7 +957,7 @@ def run_sync(files_to_process: List[Tuple[str, str]], errors_out: str):
     print(f"  - Files with errors: {file_stats['errors']}")
     print(f"  - Vectors deleted: {len(delete_operations)} files")
     print(f"  - Chunks upserted: {total_upserted}")
-    print(f"  - Embedding model: text-embedding-3-small")
+    print(f"  - Embedding model: text-embedding-3-small (dim={DIMENSION})")
     if failures:
         print(
             f"[error] {len(failures)} failures encountered. See {errors_out} for details. Use --retry-errors to re-run.")
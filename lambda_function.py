@@ -20,6 +20,8 @@ logger.setLevel(logging.INFO)
 # Pinecone index config
 INDEX_NAME = "model-earth-jam-stack"
 index = pinecone_client.Index(INDEX_NAME)
+# Must match the dimension the index was built with (same variable as the query handler)
+EMBEDDING_DIMENSIONS = int(os.environ.get("EMBEDDING_DIMENSIONS", "1536"))
 gemini_model = genai.GenerativeModel("gemini-2.5-flash-lite")
 
 def get_all_namespaces():
@@ -30,7 +32,8 @@ def query_all_namespaces(question, top_k=10, per_ns_k=5, min_score=None):
     try:
         embed_response = openai_client.embeddings.create(
             model="text-embedding-3-small",
-            input=question
+            input=question,
+            dimensions=EMBEDDING_DIMENSIONS
         )
         query_vector = embed_response.data[0].embedding
     except Exception as e:
@@ -3,8 +3,17 @@ Shared library utilities for CodeChat
 
 This package contains shared utilities used across ingestion and scripts:
 - pine.py: Pinecone client wrapper
+- paths.py: Path metadata helpers (standard library only)
 """
 
-from .pine import PineconeClient
+from .paths import path_segments
 
-__all__ = ['PineconeClient']
+__all__ = ['PineconeClient', 'path_segments']
+
+
+def __getattr__(name):
+    # Imported on first use so lib.paths works without the Pinecone SDK installed
+    if name == 'PineconeClient':
+        from .pine import PineconeClient
+        return PineconeClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,21 @@
+"""
+Path metadata helpers shared by every ingestion path
+
+Standard library only, so ingestion can import it without the Pinecone SDK.
+"""
+
+from pathlib import Path
+from typing import List
+
+
+def path_segments(file_path: str) -> List[str]:
+    """Lowercased directory names, file name and stem of a path.
+
+    Stored as list metadata so the query side can match paths with `$in`
+    instead of scanning every file_path string.
+    """
+    path = Path(file_path)
+    segments = [part.lower() for part in path.parts if part not in ('/', '.', '..')]
+    if path.suffix:
+        segments.append(path.stem.lower())
+    return list(dict.fromkeys(segments))
@@ -10,6 +10,24 @@ except ImportError:
     print("❌ Pinecone package not found. Install with: pip install pinecone-client")
     raise
 
+try:
+    from lib.paths import path_segments
+except ImportError:
+    from paths import path_segments
+
+# Timestamps are stored as integer seconds since 2020-01-01 UTC: fits a uint32
+# for ~136 years and can be range-filtered server-side ({"ts_u32": {"$gt": ...}})
+TIMESTAMP_EPOCH = 1_577_836_800
+
+# Must match the dimension vectors are embedded with (same variable as ingestion
+# and the query handler)
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', '1536'))
+
+
+def to_ts_u32(seconds: float) -> int:
+    """Convert a Unix timestamp to whole seconds since TIMESTAMP_EPOCH"""
+    return max(0, int(seconds) - TIMESTAMP_EPOCH)
+
 
 class PineconeClient:
     """Pinecone client for storing and retrieving code embeddings"""
@@ -37,7 +55,7 @@ class PineconeClient:
                 print(f"📝 Creating Pinecone index '{self.index_name}'...")
                 self.pc.create_index(
                     name=self.index_name,
-                    dimension=1536,  # OpenAI ada-002 dimension
+                    dimension=EMBEDDING_DIMENSIONS,
                     metric='cosine',
                     spec=ServerlessSpec(cloud='aws', region=self.environment.split('-')[0])
                 )
@@ -72,8 +90,9 @@ class PineconeClient:
             # Create unique ID for the chunk
             chunk_id = chunk.get('id', '')
             if not chunk_id:
-                # Generate ID from content hash if not provided
-                content_hash = hashlib.md5(chunk.get('content', '').encode()).hexdigest()[:16]
+                # Generate ID from content hash if not provided (64-bit BLAKE2b:
+                # faster than md5 on 64-bit CPUs and no truncation needed)
+                content_hash = hashlib.blake2b(chunk.get('content', '').encode(), digest_size=8).hexdigest()
                 chunk_id = f"{repo_name}_{Path(file_path).name}_{content_hash}"
 
             # Prepare enhanced metadata
@@ -82,9 +101,10 @@ class PineconeClient:
                 'file_path': file_path,
                 'chunk_content': chunk.get('content', ''),
                 'chunk_summary': chunk_summary,
-                'chunk_id': chunk_id,
                 'language': self._detect_language(file_path),
-                'timestamp': str(Path(file_path).stat().st_mtime) if Path(file_path).exists() else '',
+                'file_type': Path(file_path).suffix.lstrip('.').lower(),
+                'path_segments': path_segments(file_path),
+                'ts_u32': to_ts_u32(Path(file_path).stat().st_mtime) if Path(file_path).exists() else 0,
                 'line_start': chunk.get('start_line', 0),
                 'line_end': chunk.get('end_line', 0),
                 'chunk_type': chunk.get('type', 'code')
@@ -288,6 +308,38 @@ class PineconeClient:
             print(f"❌ Failed to delete vectors: {e}")
             return False
 
+    def backfill_path_metadata(self, namespace: Optional[str] = None, batch_size: int = 100) -> int:
+        """
+        Add path_segments (and file_type) to vectors written before those fields existed
+
+        Path filters on the query side match only vectors that carry path_segments,
+        so this must run once per namespace over data ingested before the field.
+
+        Args:
+            namespace: Namespace to backfill (defaults to the client's namespace)
+            batch_size: Vector IDs fetched per request
+
+        Returns:
+            Number of vectors updated
+        """
+        namespace = namespace or self.namespace
+        updated = 0
+        # index.list pages through every vector ID in the namespace (serverless indexes)
+        for ids in self.index.list(namespace=namespace, limit=batch_size):
+            fetched = self.index.fetch(ids=list(ids), namespace=namespace)
+            for vector_id, vector in fetched.vectors.items():
+                metadata = vector.metadata or {}
+                file_path = metadata.get('file_path')
+                if not file_path or metadata.get('path_segments'):
+                    continue
+                new_metadata = {'path_segments': path_segments(file_path)}
+                if not metadata.get('file_type'):
+                    new_metadata['file_type'] = Path(file_path).suffix.lstrip('.').lower()
+                self.index.update(id=vector_id, set_metadata=new_metadata, namespace=namespace)
+                updated += 1
+        print(f"✅ Backfilled path metadata on {updated} vectors in '{namespace}'")
+        return updated
+
     def _detect_language(self, file_path: str) -> str:
         """Detect programming language from file extension"""
         ext = Path(file_path).suffix.lower()
@@ -20,6 +20,8 @@ pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
 # Pinecone index config
 INDEX_NAME = "model-earth-jam-stack"
 index = pinecone_client.Index(INDEX_NAME)
+# Must match the dimension the index was built with (same variable as the query handler)
+EMBEDDING_DIMENSIONS = int(os.environ.get("EMBEDDING_DIMENSIONS", "1536"))
 gemini_model = genai.GenerativeModel("gemini-2.5-flash-lite")
 
 # Get all namespaces once
@@ -32,7 +34,8 @@ def query_all_namespaces(question, top_k=10, per_ns_k=5, min_score=None):
     try:
         embed_response = openai_client.embeddings.create(
             model="text-embedding-3-small",
-            input=question
+            input=question,
+            dimensions=EMBEDDING_DIMENSIONS
         )
         query_vector = embed_response.data[0].embedding
     except Exception as e:
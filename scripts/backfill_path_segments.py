@@ -0,0 +1,43 @@
+"""
+Path Metadata Backfill Script
+
+Adds path_segments (and file_type where missing) to vectors ingested before
+those fields existed. The query handler's entity, file and structure searches
+filter on path_segments, so run this once per index after upgrading.
+
+Usage:
+    python scripts/backfill_path_segments.py                 # every namespace
+    python scripts/backfill_path_segments.py --namespace io  # one namespace
+"""
+
+import os
+import argparse
+
+# Add the core modules to path
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from lib.pine import PineconeClient
+
+
+def main():
+    """Command-line interface for the path metadata backfill."""
+    parser = argparse.ArgumentParser(description="Backfill path_segments metadata on existing Pinecone vectors.")
+    parser.add_argument('--index', default=os.getenv('PINECONE_INDEX', 'repo-chunks'),
+                        help="Pinecone index name (default: $PINECONE_INDEX or repo-chunks)")
+    parser.add_argument('--namespace', action='append',
+                        help="Namespace to backfill; repeat for several (default: all namespaces)")
+    args = parser.parse_args()
+
+    client = PineconeClient(index_name=args.index)
+    namespaces = args.namespace or list(client.index.describe_index_stats().namespaces.keys())
+
+    total = 0
+    for namespace in namespaces:
+        total += client.backfill_path_metadata(namespace)
+    print(f"Backfilled {total} vectors across {len(namespaces)} namespaces.")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,13 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
+# orjson parses the archive's long float arrays several times faster than json
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 try:
     from lib.pine import PineconeClient
 except ImportError:
@@ -130,7 +137,7 @@ class VectorRestorer:
             
             # Download checksum file
             checksum_obj = s3_client.get_object(Bucket=self.s3_bucket, Key=checksum_key)
-            checksum_data = json.loads(checksum_obj['Body'].read())
+            checksum_data = json_loads(checksum_obj['Body'].read())
             
             # Validate checksum
             expected_checksum = checksum_data['archive_sha256']
@@ -141,7 +148,7 @@ class VectorRestorer:
                 return None
             
             logger.info("Archive checksum validated successfully")
-            return json.loads(archive_content)
+            return json_loads(archive_content)
             
         except Exception as e:
             logger.error(f"Failed to download or validate archive: {e}")
@@ -4,12 +4,170 @@ Performs targeted searches within specific GitHub repositories based on query in
 Enhanced with repository-aware search strategies - v3.0
 """
 
+import fnmatch
 import json
+import math
+import operator
+import os
+import random
 import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 
+# text-embedding-3 vectors are Matryoshka-trained: a shorter prefix keeps most
+# of the retrieval quality. Must match the dimension the index was built with.
+EMBEDDING_DIMENSIONS = int(os.environ.get('EMBEDDING_DIMENSIONS', '1536'))
+
+# Upper bound on concurrent Pinecone queries per search
+MAX_SEARCH_WORKERS = 16
+
+# Early exit: once a namespace's highest-confidence strategy returns at least
+# SEARCH_EARLY_EXIT_MIN_RESULTS matches whose best score * confidence reaches
+# the threshold, its remaining strategies are skipped. Off unless configured,
+# since it trades one extra round of latency for fewer Pinecone queries.
+SEARCH_EARLY_EXIT_THRESHOLD = float(os.environ['SEARCH_EARLY_EXIT_THRESHOLD']) if os.environ.get('SEARCH_EARLY_EXIT_THRESHOLD') else None
+SEARCH_EARLY_EXIT_MIN_RESULTS = int(os.environ.get('SEARCH_EARLY_EXIT_MIN_RESULTS', '5'))
+
+# Semantic result cache (see SemanticCache)
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+SEMANTIC_CACHE_TTL = int(os.environ.get('SEMANTIC_CACHE_TTL', '300'))
+SEMANTIC_CACHE_SIZE = int(os.environ.get('SEMANTIC_CACHE_SIZE', '256'))
+
+# Exact-string LRU of query embeddings, shared across warm invocations
+QUERY_VECTOR_CACHE_SIZE = 1024
+
+# Query vectors are sent to Pinecone as JSON; rounding to 6 decimals (finer
+# than text-embedding-3's useful precision) roughly halves each payload
+QUERY_VECTOR_DECIMALS = 6
+
+# Exact (query, repository_context) LRU of QueryAnalysis results
+QUERY_ANALYSIS_CACHE_SIZE = 1024
+
+# Retry/circuit-breaker settings for remote calls (see call_with_retry)
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5   # seconds, doubled per attempt, full jitter
+RETRY_MAX_DELAY = 8.0
+BREAKER_FAIL_MAX = 5
+BREAKER_RESET_TIMEOUT = 30  # seconds
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """Stops calling a service after repeated consecutive failures.
+    
+    After fail_max failures in a row the circuit opens and calls fail fast
+    with CircuitOpenError for reset_timeout seconds. After that a single call
+    is let through as a trial (others keep failing fast until it finishes):
+    success closes the circuit, failure opens it for another reset_timeout.
+    Module-level instances are shared by the search thread pool and by warm
+    invocations, so a failing service doesn't tie up every worker.
+    """
+    
+    def __init__(self, name: str, fail_max: int = BREAKER_FAIL_MAX, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        """Call fn once, counting its outcome towards the breaker state"""
+        with self._lock:
+            if self._opened_at is not None:
+                if self._trial_running or time.time() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.name} circuit open after {self._failures} consecutive failures")
+                self._trial_running = True
+                is_trial = True
+            else:
+                is_trial = False
+        
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                if is_trial:
+                    self._trial_running = False
+                if _is_client_error(e):
+                    # A bad request says nothing about the service's health,
+                    # but a trial that got an answer shows it is reachable
+                    if is_trial:
+                        self._opened_at = None
+                    raise
+                self._failures += 1
+                if is_trial or self._failures >= self.fail_max:
+                    if self._opened_at is None:
+                        print(f"Warning: {self.name} circuit opened for {self.reset_timeout}s")
+                    self._opened_at = time.time()
+            raise
+        
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            if is_trial:
+                self._trial_running = False
+        return result
+
+OPENAI_BREAKER = CircuitBreaker('openai')
+# Pinecone calls are retried before a failure is recorded, and one search fans
+# out to up to MAX_SEARCH_WORKERS of them: the circuit only opens once a whole
+# fan-out's worth of calls have failed in a row, not on a blip two strategies saw
+PINECONE_BREAKER = CircuitBreaker('pinecone', fail_max=MAX_SEARCH_WORKERS)
+BEDROCK_BREAKER = CircuitBreaker('bedrock')
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def _status_of(error: Exception) -> Optional[int]:
+    """HTTP status of an OpenAI, Pinecone or botocore error, if it carries one"""
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    response = getattr(error, 'response', None)
+    if status is None and isinstance(response, dict):
+        status = response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return status if isinstance(status, int) else None
+
+def _is_client_error(error: Exception) -> bool:
+    status = _status_of(error)
+    return status is not None and 400 <= status < 500 and status != 429
+
+def _is_retryable(error: Exception) -> bool:
+    """Throttling or transient server errors from OpenAI, Pinecone or botocore"""
+    if _status_of(error) in _RETRYABLE_STATUS:
+        return True
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        code = response.get('Error', {}).get('Code', '')
+        return 'Throttl' in code or code in ('TooManyRequestsException', 'ServiceUnavailableException')
+    return type(error).__name__ in ('RateLimitError', 'APITimeoutError', 'APIConnectionError')
+
+def call_with_retry(breaker: CircuitBreaker, fn, *args, **kwargs):
+    """Call fn through breaker, retrying throttled/transient errors with exponential backoff
+    
+    The breaker sees the whole retry sequence as one call, so it records one
+    failure only once every attempt has failed.
+    """
+    return breaker.call(_retry, breaker.name, fn, *args, **kwargs)
+
+def _retry(name: str, fn, *args, **kwargs):
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS - 1 or not _is_retryable(e):
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            print(f"Retrying {name} call after {type(e).__name__} "
+                  f"(attempt {attempt + 1}/{RETRY_ATTEMPTS}) in {delay:.2f}s")
+            time.sleep(delay)
+
 class QueryType(Enum):
     CONCEPTUAL = "conceptual"      # "what is this about?"
     FUNCTIONAL = "functional"      # "how does this work?" 
@@ -20,78 +178,361 @@ class QueryType(Enum):
     FILE_SEARCH = "file_search"   # "find file X" or "where is Y"
     CODE_SEARCH = "code_search"   # "find function/class X"
 
-@dataclass
+@dataclass(frozen=True)
 class QueryAnalysis:
+    # Immutable so cached analyses can be shared between requests
     query_type: QueryType
-    entities: List[str]
+    entities: Tuple[str, ...]
     scope: str  # 'file', 'module', 'cross-cutting'
     complexity: str  # 'simple', 'medium', 'complex'
-    intent_keywords: List[str]
-    search_strategies: List[str]
+    intent_keywords: Tuple[str, ...]
+    search_strategies: Tuple[str, ...]
     confidence: float
-    specific_targets: List[str]  # Specific files, functions, classes mentioned
+    specific_targets: Tuple[str, ...]  # Specific files, functions, classes mentioned
     repository_context: str     # Which repository is most relevant
 
+class SemanticCache:
+    """Caches ranked search results keyed by query embedding.
+    
+    Kept at module scope so it survives warm Lambda invocations. A lookup hits
+    when a cached query with the same scope (namespaces and query analysis) has
+    cosine similarity at or above the threshold and is younger than the TTL,
+    so near-duplicate questions skip the whole retrieval pipeline.
+    """
+    
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: int = SEMANTIC_CACHE_TTL, max_entries: int = SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (float32 unit vector, scope, results, timestamp), oldest first
+        self._entries: List[Tuple[array, Any, List[Dict], float]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> array:
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return array('f', (v / norm for v in vector))
+
+    def lookup(self, vector: List[float], scope) -> Optional[List[Dict]]:
+        """Return cached results for the most similar fresh query, if any"""
+        if not vector or self.max_entries <= 0:
+            return None
+        
+        unit = self._normalize(vector)
+        cutoff = time.time() - self.ttl_seconds
+        best_score, best_results = self.threshold, None
+        
+        with self._lock:
+            self._entries = [entry for entry in self._entries if entry[3] >= cutoff]
+            for cached_vector, cached_scope, results, _ in self._entries:
+                if cached_scope != scope:
+                    continue
+                score = sum(map(operator.mul, unit, cached_vector))
+                if score >= best_score:
+                    best_score, best_results = score, results
+        
+        return list(best_results) if best_results is not None else None
+
+    def add(self, vector: List[float], scope, results: List[Dict]) -> None:
+        """Remember the ranked results for this query embedding"""
+        if not vector or self.max_entries <= 0:
+            return
+        
+        with self._lock:
+            self._entries.append((self._normalize(vector), scope, list(results), time.time()))
+            del self._entries[:-self.max_entries]
+
+_SEMANTIC_CACHE = SemanticCache()
+
+class LRUCache:
+    """Small thread-safe exact-key LRU shared across warm invocations"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Any, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Cached as float32 arrays: 4 bytes per dimension instead of a boxed Python float
+_QUERY_VECTORS = LRUCache(QUERY_VECTOR_CACHE_SIZE)
+_QUERY_ANALYSES = LRUCache(QUERY_ANALYSIS_CACHE_SIZE)
+
+def _freeze(value):
+    """Hashable form of a (nested) Pinecone filter dict"""
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+# Extra contextual keywords per query type, looked up once instead of
+# walking an if/elif chain of enum comparisons
+_QUERY_TYPE_KEYWORDS = {
+    QueryType.EXAMPLE: ('example', 'demo', 'usage', 'how to'),
+    QueryType.DEBUGGING: ('error', 'fix', 'debug', 'issue'),
+    QueryType.IMPLEMENTATION: ('implement', 'create', 'build'),
+}
+
+# Filters match structured metadata written at ingestion (file_type,
+# path_segments, function_names, class_names) with $in so Pinecone can use its
+# metadata index instead of scanning file_path/chunk_content strings.
+# Vectors ingested before path_segments existed are let through by this clause
+# and matched locally; it matches nothing once scripts/backfill_path_segments.py
+# has run.
+_LEGACY_PATH_CLAUSE = {"path_segments": {"$exists": False}}
+
+
+def _file_types_clause(file_types: List[str]) -> Dict:
+    """file_type clause matching any of the given extensions"""
+    return {"$in": [ft.lstrip('.').lower() for ft in file_types]}
+
+def _structure_clues_clause(structure_clues: List[str]) -> Dict:
+    """path_segments clause matching any structure clue"""
+    return {"$in": [clue.strip('/').lower() for clue in structure_clues]}
+
+# Repository-specific patterns and contexts
+_REPO_PATTERNS = {
+    "webroot": {
+        "keywords": ["frontend", "web", "ui", "html", "css", "javascript", "components"],
+        "file_types": [".html", ".css", ".js", ".md"],
+        "structure_clues": ["components", "css", "js", "views", "pages"]
+    },
+    "localsite": {
+        "keywords": ["local", "development", "setup", "configuration", "environment"],
+        "file_types": [".py", ".md", ".json", ".yml", ".yaml"],
+        "structure_clues": ["local", "dev", "config", "setup"]
+    },
+    "io": {
+        "keywords": ["data", "io", "input", "output", "processing", "models"],
+        "file_types": [".py", ".json", ".csv", ".md"],
+        "structure_clues": ["data", "models", "io", "processing"]
+    },
+    "codechat": {
+        "keywords": ["chat", "lambda", "api", "backend", "search", "embedding"],
+        "file_types": [".py", ".md", ".json", ".tf"],
+        "structure_clues": ["lambda", "backend", "api", "src"]
+    }
+}
+
+# Everything the strategies derive from a repository context is static, so it
+# is built once here and filter builders only reference it (do not mutate)
+for _repo_context in _REPO_PATTERNS.values():
+    _repo_context['keywords_lower'] = tuple((kw, kw.lower()) for kw in _repo_context['keywords'])
+    _repo_context['file_type_clause'] = _file_types_clause(_repo_context['file_types'])
+    _repo_context['structure_filter'] = {"$or": [
+        {"path_segments": _structure_clues_clause(_repo_context['structure_clues'])},
+        _LEGACY_PATH_CLAUSE
+    ]}
+
+# Targets repeat across namespaces, strategies and returned matches, so the
+# per-target normalisation and clauses are built once and shared (do not mutate)
+
+_EXTENSION_GLOB = re.compile(r'\*\.(\w+)')
+
+@lru_cache(maxsize=1024)
+def _path_clauses(pattern: str) -> Optional[Tuple[Dict, ...]]:
+    """Clauses matching a file name or path; None when only a local match is possible
+
+    Pinecone filters have no pattern operator: `*.ext` maps to file_type and any
+    other glob is left to _matches_path on the returned matches.
+    """
+    if any(ch in pattern for ch in '*?['):
+        extension = _EXTENSION_GLOB.fullmatch(pattern)
+        if extension:
+            return ({"file_type": {"$in": [extension.group(1).lower()]}},)
+        return None
+    return ({"path_segments": {"$in": [_path_name(pattern)]}},)
+
+@lru_cache(maxsize=4096)
+def _path_name(pattern: str) -> str:
+    return pattern.replace('\\', '/').rstrip('/').rsplit('/', 1)[-1].lower()
+
+def _matches_path(metadata: Dict, pattern: str) -> bool:
+    """Local counterpart of _path_clauses, applied to a returned match"""
+    if any(ch in pattern for ch in '*?['):
+        return fnmatch.fnmatch(metadata.get('file_path', '').lower(), pattern.lower())
+    segments = metadata.get('path_segments')
+    if segments:
+        return _path_name(pattern) in segments
+    # Vectors ingested before path_segments existed
+    return _path_name(pattern) in metadata.get('file_path', '').lower()
+
+def _matches_entity(metadata: Dict, entity: str) -> bool:
+    """Local counterpart of _entity_clauses, applied to a returned match"""
+    return (_matches_path(metadata, entity)
+            or entity in (metadata.get('function_names') or [])
+            or entity in (metadata.get('class_names') or []))
+
+@lru_cache(maxsize=1024)
+def _entity_clauses(entity: str) -> Optional[Tuple[Dict, ...]]:
+    """Clauses matching an entity by path segment, function name or class name"""
+    path_clauses = _path_clauses(entity)
+    if path_clauses is None:
+        return None
+    return path_clauses + (
+        {"function_names": {"$in": [entity]}},
+        {"class_names": {"$in": [entity]}}
+    )
+
+def _targets_filter(targets: List[str], clause_fn) -> Dict:
+    """$or of every target's clauses; no filter when a target can only be matched locally"""
+    clauses = []
+    for target in targets:
+        target_clauses = clause_fn(target)
+        if target_clauses is None:
+            return {}
+        clauses.extend(target_clauses)
+    clauses.append(_LEGACY_PATH_CLAUSE)
+    return {"$or": clauses}
+
 class RepositoryIntelligentSearchAgent:
     """Performs intelligent, repository-aware searches based on query analysis"""
     
-    def __init__(self, index, repo_namespace_map, bedrock_client, openai_client=None):
+    def __init__(self, index, repo_namespace_map, bedrock_client, openai_client=None,
+                 early_exit_threshold: Optional[float] = SEARCH_EARLY_EXIT_THRESHOLD,
+                 early_exit_min_results: int = SEARCH_EARLY_EXIT_MIN_RESULTS):
         self.index = index
         self.repo_namespace_map = repo_namespace_map
         self.bedrock_client = bedrock_client
         self.openai_client = openai_client
+        self.early_exit_threshold = early_exit_threshold
+        self.early_exit_min_results = early_exit_min_results
         
         # Repository-specific patterns and contexts
-        self.repo_patterns = {
-            "webroot": {
-                "keywords": ["frontend", "web", "ui", "html", "css", "javascript", "components"],
-                "file_types": [".html", ".css", ".js", ".md"],
-                "structure_clues": ["components", "css", "js", "views", "pages"]
-            },
-            "localsite": {
-                "keywords": ["local", "development", "setup", "configuration", "environment"],
-                "file_types": [".py", ".md", ".json", ".yml", ".yaml"],
-                "structure_clues": ["local", "dev", "config", "setup"]
-            },
-            "io": {
-                "keywords": ["data", "io", "input", "output", "processing", "models"],
-                "file_types": [".py", ".json", ".csv", ".md"],
-                "structure_clues": ["data", "models", "io", "processing"]
-            },
-            "codechat": {
-                "keywords": ["chat", "lambda", "api", "backend", "search", "embedding"],
-                "file_types": [".py", ".md", ".json", ".tf"],
-                "structure_clues": ["lambda", "backend", "api", "src"]
-            }
-        }
+        self.repo_patterns = _REPO_PATTERNS
 
-    def intelligent_repository_search(self, query: str, analysis: QueryAnalysis, target_namespaces: List[str]) -> List[Dict]:
+    def intelligent_repository_search(self, query: str, analysis: QueryAnalysis, target_namespaces: List[str],
+                                      no_cache: bool = False) -> List[Dict]:
         """Perform intelligent search targeted to specific repository contexts"""
         all_results = []
+        namespaces = [namespace for namespace in target_namespaces if namespace]
+        
+        # Only the raw query is embedded before the cache lookup, so a hit
+        # skips embedding the strategy texts. The scope keeps near-duplicate
+        # queries that name different targets (app1.py vs app2.py) or need
+        # different strategies and filters from sharing results.
+        query_vector = None
+        if not no_cache:
+            self._prefetch_query_vectors([query])
+            query_vector = _QUERY_VECTORS.get(query)
+        cache_scope = (frozenset(namespaces), analysis.specific_targets, analysis.query_type,
+                       analysis.repository_context, analysis.complexity)
+        if query_vector:
+            cached_results = _SEMANTIC_CACHE.lookup(query_vector, cache_scope)
+            if cached_results is not None:
+                print(f"⚡ Semantic cache hit for: '{query}'")
+                return cached_results
+        
+        # Plan every (namespace, strategy) pair first so all query texts can be
+        # embedded in a single OpenAI request before any Pinecone query runs.
+        # Identical entries (e.g. two repositories mapped to the same
+        # namespace) are only dispatched once.
+        plan = {}
+        for namespace in namespaces:
+            for strategy in self._get_repository_strategies(namespace, analysis):
+                texts = self._strategy_query_texts(strategy, query, analysis)
+                key = (namespace, strategy['name'], _freeze(strategy.get('filters', {})), tuple(texts))
+                plan.setdefault(key, (namespace, strategy, texts))
+        plan = list(plan.values())
+        self._prefetch_query_vectors([query] + [text for _, _, texts in plan for text in texts])
+        
+        if not plan:
+            return self._deduplicate_and_rank(all_results, analysis)
+        
+        if self.early_exit_threshold is None:
+            outcomes = self._execute_plan(plan, query, analysis)
+        else:
+            outcomes = self._execute_plan_with_early_exit(plan, query, analysis)
         
-        for namespace in target_namespaces:
-            if not namespace:
+        # Collect in plan order to keep ranking deterministic
+        for (namespace, strategy, _), outcome in zip(plan, outcomes):
+            if outcome is None:
+                continue  # skipped by early exit
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                results = outcome
+                if results:
+                    # Mark results with strategy and repository context. Matches are
+                    # Pinecone SDK objects that support item assignment but not update()
+                    for result in results:
+                        result['search_strategy'] = strategy['name']
+                        result['repository'] = namespace
+                        result['strategy_confidence'] = strategy['confidence']
+                    all_results.extend(results)
+            except Exception as e:
+                print(f"Strategy {strategy['name']} failed for {namespace}: {e}")
                 continue
-                
-            # Get repository-specific search strategies
-            repo_strategies = self._get_repository_strategies(namespace, analysis)
-            
-            # Execute targeted searches for this repository
-            for strategy in repo_strategies:
-                try:
-                    results = self._execute_strategy(strategy, query, analysis, namespace)
-                    if results:
-                        # Mark results with strategy and repository context
-                        for result in results:
-                            result['search_strategy'] = strategy['name']
-                            result['repository'] = namespace
-                            result['strategy_confidence'] = strategy['confidence']
-                        all_results.extend(results)
-                except Exception as e:
-                    print(f"Strategy {strategy['name']} failed for {namespace}: {e}")
-                    continue
         
-        return self._deduplicate_and_rank(all_results, analysis)
+        ranked_results = self._deduplicate_and_rank(all_results, analysis)
+        if query_vector and ranked_results:
+            _SEMANTIC_CACHE.add(query_vector, cache_scope, ranked_results)
+        return ranked_results
+
+    def _execute_plan(self, entries: List[Tuple], query: str, analysis: QueryAnalysis) -> List[Any]:
+        """Run plan entries concurrently; returns each entry's results or the exception it raised"""
+        if not entries:
+            return []
+        
+        # Strategies are independent Pinecone round trips, so fan them out
+        with ThreadPoolExecutor(max_workers=min(MAX_SEARCH_WORKERS, len(entries))) as executor:
+            futures = [
+                executor.submit(self._execute_strategy, strategy, query, analysis, namespace)
+                for namespace, strategy, _ in entries
+            ]
+        
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    def _execute_plan_with_early_exit(self, plan: List[Tuple], query: str, analysis: QueryAnalysis) -> List[Any]:
+        """Run each namespace's highest-confidence strategy first and the rest only if needed
+        
+        Returns outcomes aligned with plan; skipped entries are None.
+        """
+        lead = {}
+        for i, (namespace, strategy, _) in enumerate(plan):
+            if namespace not in lead or strategy['confidence'] > plan[lead[namespace]][1]['confidence']:
+                lead[namespace] = i
+        lead_indices = sorted(lead.values())
+        
+        outcomes: List[Any] = [None] * len(plan)
+        for i, outcome in zip(lead_indices, self._execute_plan([plan[i] for i in lead_indices], query, analysis)):
+            outcomes[i] = outcome
+        
+        satisfied = {plan[i][0] for i in lead_indices if self._is_sufficient(outcomes[i], plan[i][1])}
+        rest = [i for i in range(len(plan)) if outcomes[i] is None and plan[i][0] not in satisfied]
+        for i, outcome in zip(rest, self._execute_plan([plan[i] for i in rest], query, analysis)):
+            outcomes[i] = outcome
+        
+        if satisfied:
+            print(f"⏩ Early exit for namespaces: {sorted(satisfied)}")
+        return outcomes
+
+    def _is_sufficient(self, outcome: Any, strategy: Dict) -> bool:
+        """Whether a strategy's results are strong enough to skip the remaining ones"""
+        if isinstance(outcome, Exception) or not outcome or len(outcome) < self.early_exit_min_results:
+            return False
+        best_score = max(match.get('score', 0) for match in outcome) * strategy['confidence']
+        return best_score >= self.early_exit_threshold
 
     def _get_repository_strategies(self, namespace: str, analysis: QueryAnalysis) -> List[Dict]:
         """Get repository-specific search strategies based on query analysis"""
@@ -126,7 +567,7 @@ class RepositoryIntelligentSearchAgent:
         })
         
         # Strategy 4: File structure search (for file/path queries)
-        if analysis.query_type == QueryType.FILE_SEARCH:
+        if analysis.query_type is QueryType.FILE_SEARCH:
             strategies.append({
                 'name': 'file_structure_search',
                 'confidence': 0.95,
@@ -151,41 +592,96 @@ class RepositoryIntelligentSearchAgent:
         else:
             return []
 
+    def _strategy_query_texts(self, strategy: Dict, query: str, analysis: QueryAnalysis) -> List[str]:
+        """Query texts a strategy will embed (one per Pinecone query it issues)"""
+        strategy_name = strategy['name']
+        
+        if strategy_name == 'direct_entity_search':
+            targets = analysis.specific_targets
+            return [f"{' '.join(targets)} {query}"] if targets else []
+        elif strategy_name == 'contextual_search':
+            return [f"{query} {' '.join(strategy.get('query_expansion', []))}"]
+        elif strategy_name == 'semantic_repository_search':
+            # Limit to top 3 keywords
+            return [f"{query} {' '.join(strategy.get('query_expansion', [])[:3])}"]
+        elif strategy_name == 'file_structure_search':
+            file_patterns = self._extract_file_patterns(query, analysis)
+            return [f"file {' '.join(file_patterns)}"] if file_patterns else []
+        else:
+            return []
+
+    def _fused_target_search(self, targets: List[str], text: str, namespace: str,
+                             clause_fn, match_fn, label: str, per_target: int = 3) -> List[Dict]:
+        """One Pinecone query for all targets, then bucket matches per target locally"""
+        vector = self._get_query_vector(text)
+        top_k = per_target * len(targets)
+        try:
+            response = call_with_retry(
+                PINECONE_BREAKER, self.index.query,
+                vector=vector,
+                top_k=top_k,
+                include_metadata=True,
+                namespace=namespace,
+                filter=_targets_filter(targets, clause_fn)
+            )
+        except Exception as e:
+            print(f"{label} error for {', '.join(targets)}: {e}")
+            return []
+        if not response or "matches" not in response:
+            return []
+        
+        # Keep the per-target grouping (and top-k) of the old one-query-per-target loop
+        matches = response["matches"]
+        buckets = {target: [] for target in targets}
+        for match in matches:
+            metadata = match.get('metadata', {})
+            for target in targets:
+                if len(buckets[target]) < per_target and match_fn(metadata, target):
+                    buckets[target].append(match)
+        
+        # A full response may have been taken up by a few targets; query each
+        # target left short on its own, as the old loop would have
+        if len(matches) >= top_k and len(targets) > 1:
+            for target in targets:
+                if len(buckets[target]) >= per_target:
+                    continue
+                try:
+                    response = call_with_retry(
+                        PINECONE_BREAKER, self.index.query,
+                        vector=vector,
+                        top_k=per_target,
+                        include_metadata=True,
+                        namespace=namespace,
+                        filter=_targets_filter([target], clause_fn)
+                    )
+                except Exception as e:
+                    print(f"{label} error for {target}: {e}")
+                    continue
+                if response and "matches" in response:
+                    buckets[target] = [
+                        match for match in response["matches"]
+                        if match_fn(match.get('metadata', {}), target)
+                    ]
+        return [match for target in targets for match in buckets[target]]
+
     def _direct_entity_search(self, query: str, analysis: QueryAnalysis, namespace: str, strategy: Dict) -> List[Dict]:
         """Search for specific entities (functions, classes, files) mentioned in the query"""
-        results = []
-        
-        for target in analysis.specific_targets:
-            try:
-                # Search for exact matches in file paths
-                path_results = self.index.query(
-                    vector=self._get_query_vector(f"{target} {query}"),
-                    top_k=3,
-                    include_metadata=True,
-                    namespace=namespace,
-                    filter={
-                        "$or": [
-                            {"file_path": {"$regex": f"(?i).*{re.escape(target)}.*"}},
-                            {"chunk_content": {"$regex": f"(?i)\\b{re.escape(target)}\\b"}},
-                            {"function_names": {"$in": [target]}},
-                            {"class_names": {"$in": [target]}}
-                        ]
-                    }
-                )
-                if path_results and "matches" in path_results:
-                    results.extend(path_results["matches"])
-            except Exception as e:
-                print(f"Direct entity search error for {target}: {e}")
-                continue
+        texts = self._strategy_query_texts(strategy, query, analysis)
+        if not texts:
+            return []
         
-        return results
+        return self._fused_target_search(
+            analysis.specific_targets, texts[0], namespace,
+            _entity_clauses, _matches_entity, "Direct entity search"
+        )
 
     def _contextual_search(self, query: str, analysis: QueryAnalysis, namespace: str, strategy: Dict) -> List[Dict]:
         """Search using contextual keywords relevant to the repository"""
-        contextual_query = f"{query} {' '.join(strategy.get('query_expansion', []))}"
+        contextual_query = self._strategy_query_texts(strategy, query, analysis)[0]
         
         try:
-            results = self.index.query(
+            results = call_with_retry(
+                PINECONE_BREAKER, self.index.query,
                 vector=self._get_query_vector(contextual_query),
                 top_k=5,
                 include_metadata=True,
@@ -199,11 +695,11 @@ class RepositoryIntelligentSearchAgent:
 
     def _semantic_repository_search(self, query: str, analysis: QueryAnalysis, namespace: str, strategy: Dict) -> List[Dict]:
         """Perform semantic search enhanced with repository-specific context"""
-        repo_keywords = strategy.get('query_expansion', [])
-        enhanced_query = f"{query} {' '.join(repo_keywords[:3])}"  # Limit to top 3 keywords
+        enhanced_query = self._strategy_query_texts(strategy, query, analysis)[0]
         
         try:
-            results = self.index.query(
+            results = call_with_retry(
+                PINECONE_BREAKER, self.index.query,
                 vector=self._get_query_vector(enhanced_query),
                 top_k=7,
                 include_metadata=True,
@@ -215,8 +711,8 @@ class RepositoryIntelligentSearchAgent:
             print(f"Semantic repository search error: {e}")
             return []
 
-    def _file_structure_search(self, query: str, analysis: QueryAnalysis, namespace: str, strategy: Dict) -> List[Dict]:
-        """Search specifically for files and directory structures"""
+    def _extract_file_patterns(self, query: str, analysis: QueryAnalysis) -> List[str]:
+        """Potential file names/paths mentioned in the query"""
         file_patterns = []
         
         # Extract potential file names from query
@@ -231,68 +727,48 @@ class RepositoryIntelligentSearchAgent:
                 if any(ext in word for ext in ['.py', '.js', '.html', '.css', '.md', '.json']):
                     file_patterns.append(word)
         
-        results = []
-        for pattern in file_patterns:
-            try:
-                file_results = self.index.query(
-                    vector=self._get_query_vector(f"file {pattern}"),
-                    top_k=3,
-                    include_metadata=True,
-                    namespace=namespace,
-                    filter={
-                        "file_path": {"$regex": f"(?i).*{re.escape(pattern.replace('.', '\\.'))}.*"}
-                    }
-                )
-                if file_results and "matches" in file_results:
-                    results.extend(file_results["matches"])
-            except Exception as e:
-                print(f"File structure search error for {pattern}: {e}")
-                continue
+        return list(dict.fromkeys(file_patterns))
+
+    def _file_structure_search(self, query: str, analysis: QueryAnalysis, namespace: str, strategy: Dict) -> List[Dict]:
+        """Search specifically for files and directory structures"""
+        texts = self._strategy_query_texts(strategy, query, analysis)
+        if not texts:
+            return []
         
-        return results
+        return self._fused_target_search(
+            self._extract_file_patterns(query, analysis), texts[0], namespace,
+            _path_clauses, _matches_path, "File structure search"
+        )
 
     def _extract_contextual_keywords(self, analysis: QueryAnalysis, repo_context: Dict) -> List[str]:
         """Extract keywords that are relevant to the specific repository context"""
-        query_keywords = analysis.intent_keywords + analysis.entities
-        repo_keywords = repo_context.get('keywords', [])
+        # Lowercase each keyword once instead of per (query, repo) pair
+        query_keywords = dict.fromkeys(kw.lower() for kw in analysis.intent_keywords + analysis.entities)
+        repo_keywords = repo_context.get('keywords_lower', ())
         
         # Find intersection and relevant combinations
-        contextual = []
-        for qkw in query_keywords:
-            for rkw in repo_keywords:
-                if qkw.lower() in rkw.lower() or rkw.lower() in qkw.lower():
-                    contextual.append(rkw)
+        contextual = [
+            rkw
+            for qkw in query_keywords
+            for rkw, rkw_lower in repo_keywords
+            if qkw in rkw_lower or rkw_lower in qkw
+        ]
         
         # Add query type specific keywords
-        if analysis.query_type == QueryType.EXAMPLE:
-            contextual.extend(['example', 'demo', 'usage', 'how to'])
-        elif analysis.query_type == QueryType.DEBUGGING:
-            contextual.extend(['error', 'fix', 'debug', 'issue'])
-        elif analysis.query_type == QueryType.IMPLEMENTATION:
-            contextual.extend(['implement', 'create', 'build'])
+        contextual.extend(_QUERY_TYPE_KEYWORDS.get(analysis.query_type, ()))
         
-        return list(set(contextual))
+        # Deduplicate in first-seen order so the expanded query text is stable
+        return list(dict.fromkeys(contextual))
 
     def _build_entity_filters(self, entities: List[str], repo_context: Dict) -> Dict:
         """Build Pinecone filters for entity-specific searches"""
-        filters = {"$or": []}
-        
-        for entity in entities:
-            entity_filters = [
-                {"file_path": {"$regex": f"(?i).*{re.escape(entity)}.*"}},
-                {"chunk_content": {"$regex": f"(?i)\\b{re.escape(entity)}\\b"}}
-            ]
-            filters["$or"].extend(entity_filters)
-        
-        return filters
+        return _targets_filter(entities, _entity_clauses)
 
     def _build_contextual_filters(self, keywords: List[str], repo_context: Dict) -> Dict:
         """Build filters based on contextual keywords"""
-        file_types = repo_context.get('file_types', [])
-        
         filters = {}
-        if file_types:
-            filters["file_path"] = {"$regex": f"(?i).*({'|'.join(re.escape(ft) for ft in file_types)})$"}
+        if repo_context.get('file_types'):
+            filters["file_type"] = repo_context['file_type_clause']
         
         return filters
 
@@ -301,9 +777,8 @@ class RepositoryIntelligentSearchAgent:
         filters = {}
         
         # Filter by file types relevant to the repository
-        file_types = repo_context.get('file_types', [])
-        if file_types:
-            filters["file_path"] = {"$regex": f"(?i).*({'|'.join(re.escape(ft) for ft in file_types)})$"}
+        if repo_context.get('file_types'):
+            filters["file_type"] = repo_context['file_type_clause']
         
         # Add complexity-based filtering
         if analysis.complexity == 'simple':
@@ -315,105 +790,227 @@ class RepositoryIntelligentSearchAgent:
 
     def _build_file_structure_filters(self, analysis: QueryAnalysis, repo_context: Dict) -> Dict:
         """Build filters specifically for file structure searches"""
-        structure_clues = repo_context.get('structure_clues', [])
-        
-        filters = {"$or": []}
-        for clue in structure_clues:
-            filters["$or"].append({"file_path": {"$regex": f"(?i).*{re.escape(clue)}.*"}})
+        if not repo_context.get('structure_clues'):
+            return {}
         
-        return filters
+        return repo_context['structure_filter']
 
     def _deduplicate_and_rank(self, results: List[Dict], analysis: QueryAnalysis) -> List[Dict]:
         """Remove duplicates and rank results based on repository intelligence"""
-        # Remove duplicates by file path and line number
-        seen = set()
-        unique_results = []
-        
+        # Remove duplicates by file path and line number (first occurrence wins)
+        unique_results = {}
         for result in results:
             metadata = result.get('metadata', {})
-            key = f"{metadata.get('file_path', '')}:{metadata.get('line_start', 0)}"
-            
-            if key not in seen:
-                seen.add(key)
-                unique_results.append(result)
-        
-        # Rank by strategy confidence and relevance
-        def rank_score(result):
-            base_score = result.get('score', 0)
-            strategy_confidence = result.get('strategy_confidence', 0.5)
-            
-            # Boost for direct entity matches
-            if result.get('search_strategy') == 'direct_entity_search':
-                return base_score * 1.5 * strategy_confidence
-            
+            key = (metadata.get('file_path', ''), metadata.get('line_start', 0))
+            unique_results.setdefault(key, result)
+        unique_results = list(unique_results.values())
+        
+        # Rank by strategy confidence and relevance. Boosts depend only on the
+        # strategy, so look them up once per result instead of branching.
+        boosts = {'direct_entity_search': 1.5}
+        if analysis.query_type is QueryType.FILE_SEARCH:
             # Boost for file structure matches when looking for files
-            if (analysis.query_type == QueryType.FILE_SEARCH and 
-                result.get('search_strategy') == 'file_structure_search'):
-                return base_score * 1.4 * strategy_confidence
-            
-            return base_score * strategy_confidence
+            boosts['file_structure_search'] = 1.4
+        
+        rank_scores = [
+            result.get('score', 0) * boosts.get(result.get('search_strategy'), 1.0) * result.get('strategy_confidence', 0.5)
+            for result in unique_results
+        ]
+        order = sorted(range(len(unique_results)), key=rank_scores.__getitem__, reverse=True)
+        return [unique_results[i] for i in order]
+
+    def _prefetch_query_vectors(self, texts: List[str]) -> None:
+        """Embed all distinct query texts in one OpenAI request"""
+        pending = [text for text in dict.fromkeys(texts) if _QUERY_VECTORS.get(text) is None]
+        if not pending or not self.openai_client:
+            return
         
-        return sorted(unique_results, key=rank_score, reverse=True)
+        try:
+            embed_response = OPENAI_BREAKER.call(
+                self.openai_client.embeddings.create,
+                model="text-embedding-3-small",
+                input=pending,
+                dimensions=EMBEDDING_DIMENSIONS
+            )
+            for item in embed_response.data:
+                _QUERY_VECTORS.put(pending[item.index], array('f', item.embedding))
+        except Exception as e:
+            # Strategies fall back to embedding their own query texts
+            print(f"Error batch-embedding {len(pending)} queries: {e}")
 
     def _get_query_vector(self, query: str):
         """Get embedding vector for query"""
+        cached_vector = _QUERY_VECTORS.get(query)
+        if cached_vector is not None:
+            return [round(v, QUERY_VECTOR_DECIMALS) for v in cached_vector]
+        
         if not self.openai_client:
             print("Warning: No OpenAI client available for embedding generation")
             return None
             
         try:
-            embed_response = self.openai_client.embeddings.create(
+            embed_response = OPENAI_BREAKER.call(
+                self.openai_client.embeddings.create,
                 model="text-embedding-3-small",
-                input=query
+                input=query,
+                dimensions=EMBEDDING_DIMENSIONS
             )
-            return embed_response.data[0].embedding
+            embedding = embed_response.data[0].embedding
+            _QUERY_VECTORS.put(query, array('f', embedding))
+            return [round(v, QUERY_VECTOR_DECIMALS) for v in embedding]
         except Exception as e:
             print(f"Error generating embedding for query '{query}': {e}")
             return None
 
 
+# Query classification patterns, compiled once at import (the agent is built per request)
+_QUERY_TYPE_PATTERNS = {
+    QueryType.CONCEPTUAL: [
+        re.compile(r'\b(what is|describe|explain|overview|about|understand|concept)\b'),
+        re.compile(r'\b(purpose|goal|meaning|definition)\b')
+    ],
+    QueryType.FUNCTIONAL: [
+        re.compile(r'\b(how does|how to|mechanism|process|work|function|operate)\b'),
+        re.compile(r'\b(algorithm|logic|flow|procedure)\b')
+    ],
+    QueryType.EXAMPLE: [
+        re.compile(r'\b(example|sample|demo|show me|usage|demonstrate)\b'),
+        re.compile(r'\b(how to use|implement|apply|tutorial)\b')
+    ],
+    QueryType.COMPARISON: [
+        re.compile(r'\b(compare|difference|vs|versus|better|alternative)\b'),
+        re.compile(r'\b(option|choice|between|against)\b')
+    ],
+    QueryType.DEBUGGING: [
+        re.compile(r'\b(error|bug|issue|problem|fix|debug|troubleshoot)\b'),
+        re.compile(r'\b(not working|broken|fails|wrong)\b')
+    ],
+    QueryType.IMPLEMENTATION: [
+        re.compile(r'\b(create|build|implement|add|develop|make)\b'),
+        re.compile(r'\b(new feature|functionality|construct)\b')
+    ],
+    QueryType.FILE_SEARCH: [
+        re.compile(r'\b(find file|locate file|where is|file location)\b'),
+        re.compile(r'\b(\.py|\.js|\.html|\.css|\.md|\.json)\b'),
+        re.compile(r'\b(file|folder|directory|path)\b')
+    ],
+    QueryType.CODE_SEARCH: [
+        re.compile(r'\b(find function|find class|find method|locate code)\b'),
+        re.compile(r'\b(function|class|method|variable|constant)\b')
+    ]
+}
+
+# One alternation per QueryType so classification is a single scan per type
+_QUERY_TYPE_UNIONS = {
+    query_type: re.compile('|'.join(f'(?:{p.pattern})' for p in patterns))
+    for query_type, patterns in _QUERY_TYPE_PATTERNS.items()
+}
+
+
+@lru_cache(maxsize=256)
+def _match_weight(query_type: QueryType, text: str) -> int:
+    """Score of one union match: a phrase hit like "find file" also contains a
+    keyword hit ("file"), and both count, as with one scan per pattern"""
+    return max(1, sum(len(p.findall(text)) for p in _QUERY_TYPE_PATTERNS[query_type]))
+
+
+# Entity / target extraction patterns (case-sensitive: CamelCase vs snake_case matters)
+# (pattern, required substring); a pattern whose literal is absent from the
+# query cannot match, so a plain `in` check skips the regex engine for it
+_ENTITY_PATTERNS = (
+    (re.compile(r'\b[A-Z][a-zA-Z]*(?:[A-Z][a-zA-Z]*)*\b'), None),  # CamelCase (classes, components)
+    (re.compile(r'\b[a-z_][a-z0-9_]*\(\)\b'), '()'),  # function calls with parentheses
+    (re.compile(r'\b[a-z_][a-z0-9_]*\b'), None),  # snake_case variables/functions
+    (re.compile(r'\b[A-Z_][A-Z0-9_]*\b'), None),  # CONSTANTS
+    (re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*\.[a-zA-Z_][a-zA-Z0-9_]*'), '.'),  # method calls
+    (re.compile(r'[a-zA-Z0-9_/.-]+\.[a-z]{2,4}'), '.'),  # file names with extensions
+    (re.compile(r'/[a-zA-Z0-9_/.-]+'), '/'),  # file paths
+)
+
+_QUOTED_TARGET_PATTERN = re.compile(r'["\']([^"\']+)["\']')
+_FILE_TARGET_PATTERN = re.compile(r'\b([a-zA-Z0-9_-]+\.[a-zA-Z]{2,4})\b')
+_FUNC_TARGET_PATTERNS = (
+    re.compile(r'\bfunction\s+([a-zA-Z_][a-zA-Z0-9_]*)'),
+    re.compile(r'\bdef\s+([a-zA-Z_][a-zA-Z0-9_]*)'),
+    re.compile(r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\(\)'),
+)
+_CLASS_TARGET_PATTERNS = (
+    re.compile(r'\bclass\s+([A-Z][a-zA-Z0-9_]*)'),
+    re.compile(r'\b([A-Z][a-zA-Z]*(?:[A-Z][a-zA-Z]*)*)\b'),  # CamelCase likely to be classes
+)
+
+# Words that are never useful as entities
+_COMMON_WORDS = frozenset({
+    'the', 'and', 'or', 'but', 'how', 'what', 'why', 'where', 'when', 
+    'this', 'that', 'with', 'for', 'from', 'can', 'you', 'me', 'it'
+})
+
+# Technical terms reported as intent keywords (substring match, in this order)
+_TECH_TERMS = (
+    'function', 'class', 'method', 'variable', 'import', 'module',
+    'api', 'endpoint', 'database', 'query', 'response', 'request',
+    'test', 'debug', 'error', 'exception', 'config', 'setup',
+    'component', 'service', 'model', 'view', 'controller',
+    'authentication', 'authorization', 'validation', 'form',
+    'frontend', 'backend', 'client', 'server', 'middleware'
+)
+
+# Fallback classification when no QueryType pattern matches
+_LOCATE_WORDS = ('find', 'locate', 'where')
+_FILE_EXTENSION_HINTS = ('.py', '.js', '.html', '.css', '.md')
+
+# Substring hints for _determine_scope, checked in this order
+_SCOPE_WORDS = {
+    'cross-cutting': ('architecture', 'system', 'project', 'repository'),
+    'module': ('module', 'package', 'component'),
+    'file': ('function', 'method', 'class'),
+}
+
+def _select_strategies(query_type: QueryType, has_targets: bool, multi_entity: bool) -> Tuple[str, ...]:
+    """Search strategies for one (query type, has targets, multi-entity) combination"""
+    strategies = []
+    
+    # Always start with repository-aware semantic search
+    strategies.append('semantic_repository_search')
+    
+    # Add specific strategies based on query type
+    if has_targets:
+        strategies.insert(0, 'direct_entity_search')  # Highest priority
+    
+    if query_type == QueryType.FILE_SEARCH:
+        strategies.insert(0, 'file_structure_search')
+    elif query_type == QueryType.CODE_SEARCH:
+        strategies.append('direct_entity_search')
+    elif query_type in [QueryType.FUNCTIONAL, QueryType.IMPLEMENTATION]:
+        strategies.append('contextual_search')
+    elif query_type == QueryType.EXAMPLE:
+        strategies.append('contextual_search')
+    elif query_type == QueryType.DEBUGGING:
+        strategies.append('contextual_search')
+    
+    # Add contextual search for multi-entity queries
+    if multi_entity:
+        strategies.append('contextual_search')
+    
+    return tuple(strategies)
+
+# Strategy selection only depends on the query type and two booleans, so every
+# combination is built once at import and analyze_query just looks it up
+_STRATEGY_TABLE = {
+    (query_type, has_targets, multi_entity): _select_strategies(query_type, has_targets, multi_entity)
+    for query_type in QueryType
+    for has_targets in (False, True)
+    for multi_entity in (False, True)
+}
+
+
 class QueryAnalysisAgent:
     """Enhanced query analysis with better entity extraction and repository awareness"""
     
     def __init__(self, bedrock_client):
         self.bedrock_client = bedrock_client
         
-        # Enhanced patterns for better classification
-        self.patterns = {
-            QueryType.CONCEPTUAL: [
-                r'\b(what is|describe|explain|overview|about|understand|concept)\b',
-                r'\b(purpose|goal|meaning|definition)\b'
-            ],
-            QueryType.FUNCTIONAL: [
-                r'\b(how does|how to|mechanism|process|work|function|operate)\b',
-                r'\b(algorithm|logic|flow|procedure)\b'
-            ],
-            QueryType.EXAMPLE: [
-                r'\b(example|sample|demo|show me|usage|demonstrate)\b',
-                r'\b(how to use|implement|apply|tutorial)\b'
-            ],
-            QueryType.COMPARISON: [
-                r'\b(compare|difference|vs|versus|better|alternative)\b',
-                r'\b(option|choice|between|against)\b'
-            ],
-            QueryType.DEBUGGING: [
-                r'\b(error|bug|issue|problem|fix|debug|troubleshoot)\b',
-                r'\b(not working|broken|fails|wrong)\b'
-            ],
-            QueryType.IMPLEMENTATION: [
-                r'\b(create|build|implement|add|develop|make)\b',
-                r'\b(new feature|functionality|construct)\b'
-            ],
-            QueryType.FILE_SEARCH: [
-                r'\b(find file|locate file|where is|file location)\b',
-                r'\b(\.py|\.js|\.html|\.css|\.md|\.json)\b',
-                r'\b(file|folder|directory|path)\b'
-            ],
-            QueryType.CODE_SEARCH: [
-                r'\b(find function|find class|find method|locate code)\b',
-                r'\b(function|class|method|variable|constant)\b'
-            ]
-        }
+        self.patterns = _QUERY_TYPE_PATTERNS
 
     def analyze_query(self, query: str, repository_context: str = None) -> QueryAnalysis:
         """Enhanced query analysis with repository awareness"""
@@ -421,16 +1018,23 @@ class QueryAnalysisAgent:
         if not query or not isinstance(query, str):
             return QueryAnalysis(
                 query_type=QueryType.CONCEPTUAL,
-                entities=[],
+                entities=(),
                 scope='file',
                 complexity='simple',
-                intent_keywords=[],
-                search_strategies=['semantic_repository_search'],
+                intent_keywords=(),
+                search_strategies=('semantic_repository_search',),
                 confidence=0.1,
-                specific_targets=[],
+                specific_targets=(),
                 repository_context=repository_context or ''
             )
         
+        # Surrounding whitespace never changes the analysis (no pattern is
+        # anchored), so retries that differ only in it share a cache entry
+        cache_key = (query.strip(), repository_context or '')
+        cached_analysis = _QUERY_ANALYSES.get(cache_key)
+        if cached_analysis is not None:
+            return cached_analysis
+        
         query_lower = query.lower()
         
         try:
@@ -443,28 +1047,30 @@ class QueryAnalysisAgent:
             intent_keywords = self._extract_intent_keywords(query_lower)
             search_strategies = self._determine_intelligent_strategies(query_type, scope, entities, specific_targets)
             
-            return QueryAnalysis(
+            analysis = QueryAnalysis(
                 query_type=query_type,
-                entities=entities,
+                entities=tuple(entities),
                 scope=scope,
                 complexity=complexity,
-                intent_keywords=intent_keywords,
-                search_strategies=search_strategies,
+                intent_keywords=tuple(intent_keywords),
+                search_strategies=tuple(search_strategies),
                 confidence=0.9,
-                specific_targets=specific_targets,
+                specific_targets=tuple(specific_targets),
                 repository_context=repository_context or ''
             )
+            _QUERY_ANALYSES.put(cache_key, analysis)
+            return analysis
         except Exception as e:
             print(f"Enhanced query analysis error: {e}")
             return QueryAnalysis(
                 query_type=QueryType.CONCEPTUAL,
-                entities=[],
+                entities=(),
                 scope='file',
                 complexity='simple',
-                intent_keywords=[],
-                search_strategies=['semantic_repository_search'],
+                intent_keywords=(),
+                search_strategies=('semantic_repository_search',),
                 confidence=0.1,
-                specific_targets=[],
+                specific_targets=(),
                 repository_context=repository_context or ''
             )
 
@@ -472,84 +1078,50 @@ class QueryAnalysisAgent:
         """Enhanced entity extraction with better patterns"""
         entities = []
         
-        # Enhanced patterns for different entity types
-        patterns = [
-            r'\b[A-Z][a-zA-Z]*(?:[A-Z][a-zA-Z]*)*\b',  # CamelCase (classes, components)
-            r'\b[a-z_][a-z0-9_]*\(\)\b',  # function calls with parentheses
-            r'\b[a-z_][a-z0-9_]*\b',  # snake_case variables/functions
-            r'\b[A-Z_][A-Z0-9_]*\b',  # CONSTANTS
-            r'[a-zA-Z_][a-zA-Z0-9_]*\.[a-zA-Z_][a-zA-Z0-9_]*',  # method calls
-            r'[a-zA-Z0-9_/.-]+\.[a-z]{2,4}',  # file names with extensions
-            r'/[a-zA-Z0-9_/.-]+',  # file paths
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, query)
-            entities.extend(matches)
+        for pattern, required in _ENTITY_PATTERNS:
+            if required is None or required in query:
+                entities.extend(pattern.findall(query))
         
         # Filter out common words and very short entities
-        common_words = {
-            'the', 'and', 'or', 'but', 'how', 'what', 'why', 'where', 'when', 
-            'this', 'that', 'with', 'for', 'from', 'can', 'you', 'me', 'it'
-        }
-        entities = [e.strip('()') for e in entities if len(e) > 2 and e.lower() not in common_words]
+        entities = [e.strip('()') for e in entities if len(e) > 2 and e.lower() not in _COMMON_WORDS]
         
-        return list(set(entities))
+        return list(dict.fromkeys(entities))
 
     def _extract_specific_targets(self, query: str) -> List[str]:
         """Extract specific files, functions, or classes that the user is looking for"""
         targets = []
         
         # Look for quoted entities (highest confidence)
-        quoted_pattern = r'["\']([^"\']+)["\']'
-        quoted_matches = re.findall(quoted_pattern, query)
-        targets.extend(quoted_matches)
+        targets.extend(_QUOTED_TARGET_PATTERN.findall(query))
         
         # Look for file extensions (files)
-        file_pattern = r'\b([a-zA-Z0-9_-]+\.[a-zA-Z]{2,4})\b'
-        file_matches = re.findall(file_pattern, query)
-        targets.extend(file_matches)
+        targets.extend(_FILE_TARGET_PATTERN.findall(query))
         
         # Look for function/method patterns
-        func_patterns = [
-            r'\bfunction\s+([a-zA-Z_][a-zA-Z0-9_]*)',
-            r'\bdef\s+([a-zA-Z_][a-zA-Z0-9_]*)',
-            r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\(\)',
-        ]
-        for pattern in func_patterns:
-            matches = re.findall(pattern, query)
-            targets.extend(matches)
+        for pattern in _FUNC_TARGET_PATTERNS:
+            targets.extend(pattern.findall(query))
         
         # Look for class patterns
-        class_patterns = [
-            r'\bclass\s+([A-Z][a-zA-Z0-9_]*)',
-            r'\b([A-Z][a-zA-Z]*(?:[A-Z][a-zA-Z]*)*)\b',  # CamelCase likely to be classes
-        ]
-        for pattern in class_patterns:
-            matches = re.findall(pattern, query)
-            targets.extend(matches)
+        for pattern in _CLASS_TARGET_PATTERNS:
+            targets.extend(pattern.findall(query))
         
-        return list(set(targets))
+        return list(dict.fromkeys(targets))
 
     def _classify_query_type(self, query_lower: str) -> QueryType:
         """Enhanced query type classification"""
-        scores = {}
-        
-        for query_type, patterns in self.patterns.items():
-            score = 0
-            for pattern in patterns:
-                matches = len(re.findall(pattern, query_lower))
-                score += matches
-            scores[query_type] = score
+        scores = {
+            query_type: sum(_match_weight(query_type, m.group()) for m in union.finditer(query_lower))
+            for query_type, union in _QUERY_TYPE_UNIONS.items()
+        }
         
-        if scores:
-            max_score = max(scores.values())
-            if max_score > 0:
-                return max(scores.items(), key=lambda x: x[1])[0]
+        # Single pass; ties go to the first QueryType, as before
+        best_type = max(scores, key=scores.get)
+        if scores[best_type] > 0:
+            return best_type
         
         # Default classification based on content
-        if any(word in query_lower for word in ['find', 'locate', 'where']):
-            if any(ext in query_lower for ext in ['.py', '.js', '.html', '.css', '.md']):
+        if any(word in query_lower for word in _LOCATE_WORDS):
+            if any(ext in query_lower for ext in _FILE_EXTENSION_HINTS):
                 return QueryType.FILE_SEARCH
             else:
                 return QueryType.CODE_SEARCH
@@ -558,11 +1130,11 @@ class QueryAnalysisAgent:
 
     def _determine_scope(self, query_lower: str, entities: List[str]) -> str:
         """Determine query scope based on content and entities"""
-        if any(word in query_lower for word in ['architecture', 'system', 'project', 'repository']):
+        if any(word in query_lower for word in _SCOPE_WORDS['cross-cutting']):
             return 'cross-cutting'
-        elif any(word in query_lower for word in ['module', 'package', 'component']):
+        elif any(word in query_lower for word in _SCOPE_WORDS['module']):
             return 'module'
-        elif len(entities) == 1 and any(word in query_lower for word in ['function', 'method', 'class']):
+        elif len(entities) == 1 and any(word in query_lower for word in _SCOPE_WORDS['file']):
             return 'file'
         elif len(entities) > 3:
             return 'cross-cutting'
@@ -588,48 +1160,8 @@ class QueryAnalysisAgent:
 
     def _extract_intent_keywords(self, query_lower: str) -> List[str]:
         """Extract enhanced intent keywords"""
-        intent_words = []
-        
-        # Technical terms
-        tech_terms = [
-            'function', 'class', 'method', 'variable', 'import', 'module',
-            'api', 'endpoint', 'database', 'query', 'response', 'request',
-            'test', 'debug', 'error', 'exception', 'config', 'setup',
-            'component', 'service', 'model', 'view', 'controller',
-            'authentication', 'authorization', 'validation', 'form',
-            'frontend', 'backend', 'client', 'server', 'middleware'
-        ]
-        
-        for term in tech_terms:
-            if term in query_lower:
-                intent_words.append(term)
-        
-        return intent_words
+        return [term for term in _TECH_TERMS if term in query_lower]
 
     def _determine_intelligent_strategies(self, query_type: QueryType, scope: str, entities: List[str], specific_targets: List[str]) -> List[str]:
         """Determine intelligent search strategies based on enhanced analysis"""
-        strategies = []
-        
-        # Always start with repository-aware semantic search
-        strategies.append('semantic_repository_search')
-        
-        # Add specific strategies based on query type
-        if specific_targets:
-            strategies.insert(0, 'direct_entity_search')  # Highest priority
-        
-        if query_type == QueryType.FILE_SEARCH:
-            strategies.insert(0, 'file_structure_search')
-        elif query_type == QueryType.CODE_SEARCH:
-            strategies.append('direct_entity_search')
-        elif query_type in [QueryType.FUNCTIONAL, QueryType.IMPLEMENTATION]:
-            strategies.append('contextual_search')
-        elif query_type == QueryType.EXAMPLE:
-            strategies.append('contextual_search')
-        elif query_type == QueryType.DEBUGGING:
-            strategies.append('contextual_search')
-        
-        # Add contextual search for multi-entity queries
-        if len(entities) > 1:
-            strategies.append('contextual_search')
-        
-        return strategies
\ No newline at end of file
+        return list(_STRATEGY_TABLE[(query_type, bool(specific_targets), len(entities) > 1)])
\ No newline at end of file
@@ -1,3 +1,4 @@
+import heapq
 import json
 import os
 import re
@@ -6,9 +7,11 @@ from dataclasses import dataclass
 from enum import Enum
 from pinecone import Pinecone
 from openai import OpenAI
-import boto3
 
-from agentic_components import QueryAnalysisAgent, RepositoryIntelligentSearchAgent, QueryAnalysis, QueryType
+from agentic_components import (
+    QueryAnalysisAgent, RepositoryIntelligentSearchAgent, QueryAnalysis, QueryType, EMBEDDING_DIMENSIONS,
+    OPENAI_BREAKER, PINECONE_BREAKER, BEDROCK_BREAKER, RETRY_ATTEMPTS, call_with_retry
+)
 
 # Try to import yaml, fall back gracefully if not available
 try:
@@ -18,6 +21,46 @@ except ImportError:
     YAML_AVAILABLE = False
     print("Warning: PyYAML not available, using static mapping fallback")
 
+# Bedrock client is created once per container and reused by warm invocations,
+# so generation doesn't pay for client construction and a new TLS handshake.
+# boto3 is imported here too, keeping its import time off cold starts that only
+# answer CORS preflights or the missing-key fallback.
+_bedrock_client = None
+
+def get_bedrock_client():
+    global _bedrock_client
+    if _bedrock_client is None:
+        import boto3
+        from botocore.config import Config
+        # botocore's adaptive mode backs off with jitter and rate-limits on throttling
+        _bedrock_client = boto3.client(
+            'bedrock-runtime', region_name='us-east-1',
+            config=Config(retries={'max_attempts': RETRY_ATTEMPTS, 'mode': 'adaptive'})
+        )
+    return _bedrock_client
+
+
+# OpenAI and Pinecone clients are cached per container the same way. The
+# Pinecone Index keeps one pooled HTTP session that the strategy threads share,
+# so warm invocations reuse open connections instead of re-handshaking.
+_openai_clients = {}
+_pinecone_indexes = {}
+
+def get_openai_client(api_key):
+    client = _openai_clients.get(api_key)
+    if client is None:
+        client = _openai_clients[api_key] = OpenAI(api_key=api_key)
+    return client
+
+
+def get_pinecone_index(api_key, index_name):
+    index = _pinecone_indexes.get((api_key, index_name))
+    if index is None:
+        index = Pinecone(api_key=api_key).Index(index_name)
+        _pinecone_indexes[(api_key, index_name)] = index
+    return index
+
+
 def lambda_handler(event, context):
     """
     Enhanced Lambda handler with agentic search capabilities
@@ -43,13 +86,12 @@ def lambda_handler(event, context):
             # Fallback to temp response if keys not available
             return temp_response(event)
         
-        openai_client = OpenAI(api_key=OPENAI_API_KEY)
-        pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
-        bedrock_client = boto3.client('bedrock-runtime', region_name='us-east-1')
+        openai_client = get_openai_client(OPENAI_API_KEY)
+        bedrock_client = get_bedrock_client()
         
         # Pinecone index config
         INDEX_NAME = os.environ.get('PINECONE_INDEX', 'model-earth-jam-stack')
-        index = pinecone_client.Index(INDEX_NAME)
+        index = get_pinecone_index(PINECONE_API_KEY, INDEX_NAME)
         
         # Initialize agentic components with proper dependencies
         query_analyzer = QueryAnalysisAgent(bedrock_client)
@@ -70,6 +112,7 @@ def lambda_handler(event, context):
         
         query = request_data.get('query', '')
         repositories = request_data.get('repositories', None)
+        no_cache = bool(request_data.get('no_cache', False))
         if not repositories:
             repo = request_data.get('repo', None)
             if repo:
@@ -105,7 +148,7 @@ def lambda_handler(event, context):
         # Step 2: Perform agentic search
         response_content = agentic_search(
             query, query_analysis, openai_client, index, bedrock_client, 
-            intelligent_agent, repositories
+            intelligent_agent, repositories, no_cache
         )
         
         return {
@@ -178,7 +221,7 @@ Please wait while the Lambda layers are updated with the new dependencies."""
         'body': json.dumps({'content': response_content})
     }
 
-def agentic_search(query, query_analysis, openai_client, index, bedrock_client, intelligent_agent, repositories):
+def agentic_search(query, query_analysis, openai_client, index, bedrock_client, intelligent_agent, repositories, no_cache=False):
     """Perform enhanced repository-intelligent agentic search"""
     try:
         # Get namespaces to query with error handling
@@ -188,7 +231,7 @@ def agentic_search(query, query_analysis, openai_client, index, bedrock_client,
                 namespaces_to_query = [map_repo_to_namespace(repo) for repo in repositories if repo]
             else:
                 if index:
-                    stats = index.describe_index_stats()
+                    stats = call_with_retry(PINECONE_BREAKER, index.describe_index_stats)
                     if stats and "namespaces" in stats:
                         namespaces_to_query = list(stats["namespaces"].keys())
                         
@@ -206,7 +249,7 @@ def agentic_search(query, query_analysis, openai_client, index, bedrock_client,
                 print(f"🎯 Specific targets: {query_analysis.specific_targets}")
                 
                 combined_matches = intelligent_agent.intelligent_repository_search(
-                    query, query_analysis, namespaces_to_query
+                    query, query_analysis, namespaces_to_query, no_cache=no_cache
                 )
                 
                 if not combined_matches:
@@ -226,10 +269,9 @@ def agentic_search(query, query_analysis, openai_client, index, bedrock_client,
         if not combined_matches:
             return f"❌ No matches found for: '{query}'"
         
-        # Sort by enhanced scores with safety
+        # Best 10 by score with safety; nlargest matches a stable sort's first 10
         try:
-            combined_matches.sort(key=lambda x: x.get('score', 0), reverse=True)
-            top_matches = combined_matches[:10]
+            top_matches = heapq.nlargest(10, combined_matches, key=lambda x: x.get('score', 0))
         except Exception as e:
             print(f"Sorting error: {e}")
             top_matches = combined_matches[:10] if combined_matches else []
@@ -298,7 +340,8 @@ Please provide a helpful answer based on the code above."""
                 "inferenceConfig": {"maxTokens": 2000, "temperature": 0.1}
             }
             
-            response = bedrock_client.invoke_model(
+            response = BEDROCK_BREAKER.call(
+                bedrock_client.invoke_model,
                 modelId="amazon.nova-micro-v1:0",
                 body=json.dumps(bedrock_request)
             )
@@ -343,9 +386,11 @@ def basic_vector_search(query, openai_client, index, namespaces_to_query):
         if not openai_client:
             return []
             
-        embed_response = openai_client.embeddings.create(
+        embed_response = OPENAI_BREAKER.call(
+            openai_client.embeddings.create,
             model="text-embedding-3-small",
-            input=query
+            input=query,
+            dimensions=EMBEDDING_DIMENSIONS
         )
         if not embed_response or not embed_response.data or len(embed_response.data) == 0:
             return []
@@ -357,7 +402,8 @@ def basic_vector_search(query, openai_client, index, namespaces_to_query):
             if not ns:  # Skip None/empty namespaces
                 continue
             try:
-                results = index.query(
+                results = call_with_retry(
+                    PINECONE_BREAKER, index.query,
                     vector=query_vector,
                     top_k=5,
                     include_metadata=True,
@@ -0,0 +1,222 @@
+"""
+Unit tests for src/lambdas/query_handler/agentic_components.py.
+
+No API calls: the OpenAI client and Pinecone index are stubs. Kept outside
+query_handler/ so the test is not packaged into the Lambda.
+
+Scenarios:
+- Real Pinecone SDK match objects are tagged and ranked
+- A retried call records one breaker failure, and only after every attempt fails
+- An open circuit lets a single trial call through once reset_timeout passes
+- Fused target search buckets matches per target and re-queries short targets
+- The semantic cache hits for a repeated query and misses across different targets
+
+Run: python src/lambdas/test_query_handler.py (or pytest)
+"""
+
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+from pinecone.core.openapi.db_data.models import QueryResponse, ScoredVector
+
+THIS_DIR = Path(__file__).parent  # src/lambdas/
+sys.path.insert(0, str(THIS_DIR / "query_handler"))
+import agentic_components as ac  # type: ignore
+
+
+class StubEmbeddings:
+    """Returns a fixed 2-dim vector per input"""
+
+    def __init__(self):
+        self.requests = []
+
+    def create(self, model, input, dimensions):
+        inputs = input if isinstance(input, list) else [input]
+        self.requests.append(inputs)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[1.0, 0.0])
+                                     for i in range(len(inputs))])
+
+
+class SdkIndex:
+    """Answers every query with Pinecone SDK objects, like pinecone>=7"""
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, vector, top_k, include_metadata, namespace, filter):
+        self.queries.append({"namespace": namespace, "top_k": top_k, "filter": filter})
+        matches = [
+            ScoredVector(id=f"{namespace}-{i}", score=0.9 - i / 10,
+                         metadata={"file_path": "src/utils.py", "path_segments": ["src", "utils.py", "utils"],
+                                   "line_start": i})
+            for i in range(top_k)
+        ]
+        return QueryResponse(matches=matches, namespace=namespace)
+
+
+class PathIndex:
+    """Serves stored matches whose path_segments meet the query's $in clauses"""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def query(self, vector, top_k, include_metadata, namespace, filter):
+        self.queries.append({"top_k": top_k, "filter": filter})
+        names = {name for clause in filter.get("$or", []) for name in clause.get("path_segments", {}).get("$in", [])}
+        matches = [record for record in self.records if names & set(record["metadata"]["path_segments"])]
+        return {"matches": matches[:top_k]}
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+def make_agent(index, embeddings=None) -> "ac.RepositoryIntelligentSearchAgent":
+    return ac.RepositoryIntelligentSearchAgent(index, {}, None, SimpleNamespace(embeddings=embeddings or StubEmbeddings()))
+
+
+def make_record(file_path: str, line: int, score: float) -> dict:
+    name = file_path.rsplit("/", 1)[-1]
+    return {"id": f"{file_path}:{line}", "score": score,
+            "metadata": {"file_path": file_path, "path_segments": [name, name.split(".")[0]], "line_start": line}}
+
+
+def without_sleep(fn):
+    saved = ac.time.sleep
+    ac.time.sleep = lambda seconds: None
+    try:
+        return fn()
+    finally:
+        ac.time.sleep = saved
+
+
+def test_tags_sdk_match_objects():
+    index = SdkIndex()
+    query = "where is utils.py"
+    analysis = ac.QueryAnalysisAgent(None).analyze_query(query)
+    results = make_agent(index).intelligent_repository_search(query, analysis, ["codechat"], no_cache=True)
+
+    assert index.queries and results
+    for result in results:
+        assert isinstance(result, ScoredVector)
+        assert result["repository"] == "codechat"
+        assert result["search_strategy"]
+        assert 0 < result["strategy_confidence"] <= 1
+
+
+def test_retried_call_records_one_failure():
+    breaker = ac.CircuitBreaker("test", fail_max=2, reset_timeout=60)
+    attempts = []
+
+    def recovers():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ServiceUnavailable()
+        return "ok"
+
+    assert without_sleep(lambda: ac.call_with_retry(breaker, recovers)) == "ok"
+    assert len(attempts) == 3 and breaker._failures == 0
+
+    def always_fails():
+        attempts.append(1)
+        raise ServiceUnavailable()
+
+    attempts.clear()
+    try:
+        without_sleep(lambda: ac.call_with_retry(breaker, always_fails))
+        assert False, "expected ServiceUnavailable"
+    except ServiceUnavailable:
+        pass
+    assert len(attempts) == ac.RETRY_ATTEMPTS
+    assert breaker._failures == 1 and breaker._opened_at is None
+
+
+def test_open_circuit_allows_one_trial_call():
+    breaker = ac.CircuitBreaker("test", fail_max=1, reset_timeout=0)
+    try:
+        breaker.call(lambda: (_ for _ in ()).throw(ServiceUnavailable()))
+    except ServiceUnavailable:
+        pass
+    assert breaker._opened_at is not None
+
+    # reset_timeout has passed: the first caller becomes the trial, the rest fail fast
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def trial():
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    worker = threading.Thread(target=lambda: results.append(breaker.call(trial)))
+    worker.start()
+    started.wait(5)
+    try:
+        breaker.call(lambda: "second")
+        assert False, "expected CircuitOpenError"
+    except ac.CircuitOpenError:
+        pass
+    release.set()
+    worker.join(5)
+    assert results == ["ok"] and breaker._opened_at is None
+    assert breaker.call(lambda: "closed") == "closed"
+
+
+def test_fused_search_buckets_and_requeries_short_targets():
+    # a.py outranks b.py, so the fused top 6 holds only a.py matches
+    records = [make_record("src/a.py", i, 0.9 - i / 100) for i in range(6)]
+    records += [make_record("lib/b.py", i, 0.5 - i / 100) for i in range(4)]
+    index = PathIndex(records)
+    results = make_agent(index)._fused_target_search(
+        ["a.py", "b.py"], "a.py b.py", "ns", ac._path_clauses, ac._matches_path, "test")
+
+    assert [r["id"] for r in results] == ["src/a.py:0", "src/a.py:1", "src/a.py:2",
+                                          "lib/b.py:0", "lib/b.py:1", "lib/b.py:2"]
+    assert [q["top_k"] for q in index.queries] == [6, 3]
+
+
+def test_fused_search_skips_requery_when_response_not_full():
+    index = PathIndex([make_record("src/a.py", i, 0.9) for i in range(4)])
+    results = make_agent(index)._fused_target_search(
+        ["a.py", "b.py"], "a.py b.py", "ns", ac._path_clauses, ac._matches_path, "test")
+
+    assert len(results) == 3 and len(index.queries) == 1
+
+
+def test_semantic_cache_scoped_by_targets():
+    saved = ac._SEMANTIC_CACHE
+    ac._SEMANTIC_CACHE = ac.SemanticCache(threshold=0.9, ttl_seconds=60, max_entries=8)
+    try:
+        # Every query embeds to the same vector, so only the scope tells them apart
+        index, embeddings = SdkIndex(), StubEmbeddings()
+        agent = make_agent(index, embeddings)
+        analyzer = ac.QueryAnalysisAgent(None)
+
+        def search(query):
+            before = len(index.queries)
+            results = agent.intelligent_repository_search(query, analyzer.analyze_query(query), ["codechat"])
+            return results, len(index.queries) - before
+
+        first, queried = search("where is cachetest1.py")
+        assert queried > 0
+
+        # Hit: no Pinecone queries, and only the raw query is embedded
+        cached, queried = search("where is cachetest1.py?")
+        assert queried == 0 and cached == first
+        assert embeddings.requests[-1] == ["where is cachetest1.py?"]
+
+        # Miss: a different target has a different scope
+        _, queried = search("where is cachetest2.py")
+        assert queried > 0
+    finally:
+        ac._SEMANTIC_CACHE = saved
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")